@@ -15,14 +15,226 @@ IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 or implied.
 """
 
-from extras.scripts import Script, ObjectVar, StringVar, IntegerVar
+from extras.scripts import Script, ObjectVar, StringVar, IntegerVar, FileVar
 from tenancy.models import Tenant
 from dcim.models import Site, Location, Region
+from django.db import transaction
+from django.db.models import Max
 from django.utils.text import slugify
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from scripts import ChangeLog, ScriptConfig
+from scripts.PipelineTrigger import PipelineTriggerMixin
+import csv
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import time
 import requests
 
+# Concurrent Google Geocoding requests in batch mode
+GEOCODE_MAX_WORKERS = 8
+# Connect and read timeout for Google Geocoding requests, in seconds
+GEOCODE_TIMEOUT = (5, 10)
+GEOCODE_CACHE_TTL = 90 * 24 * 3600
+GEOCODE_CACHE_MAX_ENTRIES = 10000
 
-class CreateSiteAndLocations(Script):
+
+def normalize_address(address):
+    """Normalize an address so trivially different spellings share a cache entry."""
+    address = re.sub(r"\s*,\s*", ", ", address.strip().lower())
+    return re.sub(r"\s+", " ", address)
+
+
+class GeocodeCache:
+    """
+    Persistent cache of normalized address to (latitude, longitude).
+
+    The backend is either the NetBox (Django) cache ("django") or a SQLite
+    file path. Entries expire after `ttl` seconds; the SQLite backend also
+    evicts the oldest entries beyond `max_entries`. Fixtures, a JSON file of
+    {"address": [lat, lng]}, are served before the backend and are used for
+    offline testing.
+    """
+
+    def __init__(self, backend, ttl=GEOCODE_CACHE_TTL, max_entries=GEOCODE_CACHE_MAX_ENTRIES, fixtures=None):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.fixtures = {}
+        if fixtures:
+            with open(fixtures) as f:
+                self.fixtures = {
+                    normalize_address(address): tuple(coordinates)
+                    for address, coordinates in json.load(f).items()
+                }
+        if backend and backend != "django":
+            with sqlite3.connect(backend) as db:
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS geocode "
+                    "(address TEXT PRIMARY KEY, lat REAL, lng REAL, created REAL)"
+                )
+
+    @staticmethod
+    def _django_key(address):
+        return "geocode:" + hashlib.sha256(address.encode()).hexdigest()
+
+    def get(self, address):
+        """Return cached (lat, lng) for the address, or None."""
+        address = normalize_address(address)
+        if address in self.fixtures:
+            return self.fixtures[address]
+        if not self.backend:
+            return None
+
+        if self.backend == "django":
+            from django.core.cache import cache
+            coordinates = cache.get(self._django_key(address))
+            return tuple(coordinates) if coordinates else None
+
+        with sqlite3.connect(self.backend, timeout=10) as db:
+            row = db.execute(
+                "SELECT lat, lng FROM geocode WHERE address = ? AND created > ?",
+                (address, time.time() - self.ttl),
+            ).fetchone()
+        return tuple(row) if row else None
+
+    def set(self, address, latitude, longitude):
+        address = normalize_address(address)
+        if not self.backend:
+            return
+
+        if self.backend == "django":
+            from django.core.cache import cache
+            cache.set(self._django_key(address), [latitude, longitude], self.ttl)
+            return
+
+        with sqlite3.connect(self.backend, timeout=10) as db:
+            db.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)",
+                (address, latitude, longitude, time.time()),
+            )
+            db.execute("DELETE FROM geocode WHERE created <= ?", (time.time() - self.ttl,))
+            db.execute(
+                "DELETE FROM geocode WHERE address NOT IN "
+                "(SELECT address FROM geocode ORDER BY created DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+
+
+class SiteAndLocationsMixin(PipelineTriggerMixin):
+    """
+    Helpers shared by the single-site and batch site creation scripts.
+    """
+
+    geocode_cache = None
+    geocode_offline = False
+
+    def setup_geocoding(self, config):
+        """
+        Configure the geocoding cache and offline mode from vars.json.
+
+        :param config: ScriptConfig loaded from vars.json.
+        """
+        if not config.geocode_offline and not config.google_api_key:
+            raise ScriptConfig.ConfigError(
+                "vars.json is missing required keys: GOOGLE_API_KEY (or set GEOCODE_OFFLINE)"
+            )
+        if config.geocode_cache or config.geocode_fixtures:
+            self.geocode_cache = GeocodeCache(
+                config.geocode_cache,
+                ttl=config.geocode_cache_ttl or GEOCODE_CACHE_TTL,
+                fixtures=config.geocode_fixtures,
+            )
+        self.geocode_offline = config.geocode_offline
+
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        self.geocode_session = requests.Session()
+        self.geocode_session.mount("https://", HTTPAdapter(max_retries=retry, pool_maxsize=GEOCODE_MAX_WORKERS))
+
+    def get_coordinates(self, api_key, address):
+        """
+        Fetches GPS coordinates for the provided address using Google Maps API.
+
+        Results are served from the geocoding cache when configured; in
+        offline mode the API is never called.
+
+        :param api_key: Google Maps API key.
+        :param address: The physical address for which coordinates are fetched.
+        :return: Tuple of latitude and longitude, or None if the request fails.
+        """
+
+        if self.geocode_cache:
+            coordinates = self.geocode_cache.get(address)
+            if coordinates:
+                self.log_info(f"Using cached GPS coordinates for {address}")
+                return coordinates
+        if self.geocode_offline:
+            self.log_warning(f"Offline mode: no cached GPS coordinates for {address}")
+            return None, None
+
+        base_url = "https://maps.googleapis.com/maps/api/geocode/json"
+        params = {"address": address, "key": api_key}
+        session = getattr(self, "geocode_session", None) or requests
+
+        try:
+            response = session.get(base_url, params=params, timeout=GEOCODE_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+
+            if data.get("status") == "OK" and data.get("results"):
+                location = data["results"][0]["geometry"]["location"]
+                if self.geocode_cache:
+                    self.geocode_cache.set(address, location["lat"], location["lng"])
+                return location["lat"], location["lng"]
+            else:
+                self.log_warning(
+                    f"Google API error: {data.get('status')} - {data.get('error_message', 'No message')}"
+                )
+                return None, None
+        except requests.RequestException as e:
+            self.log_warning(f"HTTP error while querying Google API: {e}")
+            return None, None
+
+    @staticmethod
+    def build_floor(site, tenant, floor):
+        """
+        Build (without saving) the location object for one floor of a site.
+
+        :param site: The site the floor belongs to.
+        :param tenant: Tenant of the location.
+        :param floor: Floor number, may be negative.
+        :return: Unsaved Location instance.
+        """
+        location_name = f"{site.name}-{floor}"
+
+        # Use a different slug format for negative floors
+        if floor < 0:
+            location_slug = slugify(f"{site.name}-neg{-floor}")
+        else:
+            location_slug = slugify(f"{site.name}-{floor}")
+
+        return Location(
+            name=location_name,
+            slug=location_slug,
+            site=site,
+            tenant=tenant,
+            status="planned",
+            custom_field_data={
+                "ccc_rf_model": "Cubes And Walled Offices",
+                "ccc_floor_height": 10.0,
+                "ccc_floor_length": 100.0,
+                "ccc_floor_width": 100.0,
+                "ccc_floor_units": "feet",
+                "ccc_floor_number": floor
+            },
+        )
+
+
+class CreateSiteAndLocations(SiteAndLocationsMixin, Script):
     """
     Script to create a new site and associated floors as locations in NetBox.
     """
@@ -66,35 +278,6 @@ class CreateSiteAndLocations(Script):
         label="Lowest Floor", description="Enter the starting floor number (e.g., -2)."
     )
 
-    def get_coordinates(self, api_key, address):
-        """
-        Fetches GPS coordinates for the provided address using Google Maps API.
-
-        :param api_key: Google Maps API key.
-        :param address: The physical address for which coordinates are fetched.
-        :return: Tuple of latitude and longitude, or None if the request fails.
-        """
-
-        base_url = "https://maps.googleapis.com/maps/api/geocode/json"
-        params = {"address": address, "key": api_key}
-
-        try:
-            response = requests.get(base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-
-            if data.get("status") == "OK" and data.get("results"):
-                location = data["results"][0]["geometry"]["location"]
-                return location["lat"], location["lng"]
-            else:
-                self.log_warning(
-                    f"Google API error: {data.get('status')} - {data.get('error_message', 'No message')}"
-                )
-                return None, None
-        except requests.RequestException as e:
-            self.log_warning(f"HTTP error while querying Google API: {e}")
-            return None, None
-
     def run(self, data, commit):
         """
         Executes the script to create the site and associated floors.
@@ -106,12 +289,16 @@ class CreateSiteAndLocations(Script):
         self.log_info("Starting the script...")
 
         # Load the environment vars from JSON file
-        vars_data = self.load_json('vars.json')
-        GOOGLE_API_KEY = vars_data.get("GOOGLE_API_KEY")
-        GITLAB_URL = vars_data.get("GITLAB_URL")
-        GITLAB_API = vars_data.get("GITLAB_API")
-        GITLAB_TRIGGER_TOKEN = vars_data.get("GITLAB_TRIGGER_TOKEN")
-        NETBOX_URL = vars_data.get("NETBOX_API")
+        config = ScriptConfig.load_config(
+            "NETBOX_API", *(ScriptConfig.GITLAB_KEYS if commit else ())
+        )
+        GOOGLE_API_KEY = config.google_api_key
+        GITLAB_URL = config.gitlab_url
+        GITLAB_API = config.gitlab_api
+        GITLAB_TRIGGER_TOKEN = config.gitlab_trigger_token
+        GITLAB_TRIGGER_WINDOW = config.gitlab_trigger_window
+        NETBOX_URL = config.netbox_api
+        self.setup_geocoding(config)
 
         # Handle tenant and region - convert IDs to objects if needed
         # When called via API, these might be integers; when via UI, they're objects
@@ -153,30 +340,8 @@ class CreateSiteAndLocations(Script):
         floor_numbers = range(lowest_floor, lowest_floor + number_of_floors)
 
         for floor in floor_numbers:
-            location_name = f"{site.name}-{floor}"
-
-            # Use a different slug format for negative floors
-            if floor < 0:
-                location_slug = slugify(f"{site.name}-neg{-floor}")
-            else:
-                location_slug = slugify(f"{site.name}-{floor}")
-
-            # Create the location object
-            location = Location.objects.create(
-                name=location_name,
-                slug=location_slug,
-                site=site,
-                tenant=tenant,
-                status="planned",
-                custom_field_data={
-                    "ccc_rf_model": "Cubes And Walled Offices",
-                    "ccc_floor_height": 10.0,
-                    "ccc_floor_length": 100.0,
-                    "ccc_floor_width": 100.0,
-                    "ccc_floor_units": "feet",
-                    "ccc_floor_number": floor
-                },
-            )
+            location = self.build_floor(site, tenant, floor)
+            location.save()
             self.log_success(
                 f"Created location: [{location.name}]({NETBOX_URL}/dcim/locations/{location.id}) with slug: {location.slug}."
             )
@@ -188,28 +353,218 @@ class CreateSiteAndLocations(Script):
         """
         
         if commit:
-            self.log_info("Commit is set. Triggering GitLab pipeline...")
-            url = GITLAB_API
-            token = GITLAB_TRIGGER_TOKEN
-            
-            params = {
-                "token": token,
-                "variables[SITE_PIPELINE]": "true"
-            }
+            self.trigger_pipeline(
+                "SITE_PIPELINE", GITLAB_API, GITLAB_TRIGGER_TOKEN, GITLAB_URL,
+                window=GITLAB_TRIGGER_WINDOW, sites=[site.name],
+            )
+        else:
+            self.log_info("Commit is not set. Skipping GitLab pipeline trigger.")
+
+        self.log_success("All locations and site successfully created!")
 
+
+class CreateSitesAndLocationsBatch(SiteAndLocationsMixin, Script):
+    """
+    Script to create many sites and their floors from a CSV or JSON file.
+    """
+
+    class Meta:
+        """
+        Meta options for the script, including its name, description,
+        and the order of the fields.
+        """
+
+        name = "Create Sites and Locations (Batch)"
+        description = "Script to create many sites and their floors from a CSV or JSON file."
+        field_order = ["tenant", "region", "sites_file"]
+
+    # Input variables
+    tenant = ObjectVar(
+        model=Tenant, label="Tenant", description="Select the tenant for the new sites."
+    )
+    region = ObjectVar(
+        model=Region, label="Region", description="Select the region for the new sites."
+    )
+    sites_file = FileVar(
+        label="Sites File",
+        description=(
+            "CSV with a header row or JSON list of objects with the columns "
+            "site_name, address, number_of_floors and lowest_floor."
+        ),
+    )
+
+    @staticmethod
+    def parse_sites_file(content):
+        """
+        Parse and validate the uploaded sites file.
+
+        :param content: File content as text.
+        :return: Tuple of (sites, errors): the list of dicts with site_name,
+                 address, number_of_floors and lowest_floor, and the list of
+                 messages for malformed rows and duplicate site names.
+        """
+        if content.lstrip().startswith("["):
             try:
-                response = requests.post(url, params=params)
-                response.raise_for_status()
-
-                if response.status_code == 201:
-                    self.log_success(f"[Pipeline]({GITLAB_URL}/-/pipelines/) triggered successfully.")
-                else:
-                    self.log_warning(
-                        f"Unexpected response status: {response.status_code}. Response: {response.text}"
-                    )
-            except requests.exceptions.RequestException as e:
-                self.log_failure(f"Failed to trigger pipeline: {e}")
+                rows = json.loads(content)
+            except ValueError as e:
+                return [], [f"Invalid JSON: {e}"]
+            first_row = 1
+        else:
+            rows = list(csv.DictReader(io.StringIO(content)))
+            # Row numbers as shown in a spreadsheet, after the header row
+            first_row = 2
+
+        sites, errors, rows_by_slug = [], [], {}
+        for number, row in enumerate(rows, start=first_row):
+            if not isinstance(row, dict):
+                errors.append(f"Row {number}: expected an object with the site columns")
+                continue
+            missing = [
+                column for column in ("site_name", "address", "number_of_floors", "lowest_floor")
+                if row.get(column) in (None, "")
+            ]
+            if missing:
+                errors.append(f"Row {number}: missing {', '.join(missing)}")
+                continue
+            try:
+                number_of_floors = int(row["number_of_floors"])
+                lowest_floor = int(row["lowest_floor"])
+            except (TypeError, ValueError):
+                errors.append(f"Row {number}: number_of_floors and lowest_floor must be integers")
+                continue
+            if number_of_floors < 1:
+                errors.append(f"Row {number}: number_of_floors must be at least 1")
+                continue
+
+            site_name = str(row["site_name"]).strip()
+            slug = slugify(site_name)
+            if slug in rows_by_slug:
+                errors.append(f"Row {number}: site {site_name} is already defined in row {rows_by_slug[slug]}")
+                continue
+            rows_by_slug[slug] = number
+            sites.append({
+                "site_name": site_name,
+                "address": str(row["address"]).strip(),
+                "number_of_floors": number_of_floors,
+                "lowest_floor": lowest_floor,
+            })
+        return sites, errors
+
+    def run(self, data, commit):
+        """
+        Creates all sites and floors from the file in one transaction.
+
+        The file is validated first and nothing is created if any row is
+        malformed or a site name appears twice. Addresses are geocoded
+        concurrently, sites and locations are inserted with bulk_create, and
+        the GitLab pipeline is triggered once for the whole batch.
+
+        :param data: Input data from the script form.
+        :param commit: Whether to commit changes to the database.
+        """
+
+        self.log_info("Starting the batch script...")
+
+        config = ScriptConfig.load_config(
+            "NETBOX_API", *(ScriptConfig.GITLAB_KEYS if commit else ())
+        )
+        GOOGLE_API_KEY = config.google_api_key
+        GITLAB_URL = config.gitlab_url
+        GITLAB_API = config.gitlab_api
+        GITLAB_TRIGGER_TOKEN = config.gitlab_trigger_token
+        GITLAB_TRIGGER_WINDOW = config.gitlab_trigger_window
+        NETBOX_URL = config.netbox_api
+        self.setup_geocoding(config)
+
+        tenant = data["tenant"]
+        region = data["region"]
+
+        content = data["sites_file"].read()
+        if isinstance(content, bytes):
+            content = content.decode("utf-8-sig")
+        sites_data, errors = self.parse_sites_file(content)
+        if errors:
+            for error in errors:
+                self.log_failure(error)
+            self.log_failure(f"{len(errors)} problem(s) in the sites file, nothing was created.")
+            return
+
+        # Skip sites that already exist, with one query
+        existing_slugs = set(
+            Site.objects.filter(
+                slug__in=[slugify(site["site_name"]) for site in sites_data]
+            ).values_list("slug", flat=True)
+        )
+        for site_data in sites_data:
+            if slugify(site_data["site_name"]) in existing_slugs:
+                self.log_warning(f"Site {site_data['site_name']} already exists. Skipping.")
+        sites_data = [
+            site for site in sites_data if slugify(site["site_name"]) not in existing_slugs
+        ]
+
+        # Geocode each distinct address once, concurrently
+        addresses = list(dict.fromkeys(site["address"] for site in sites_data))
+        with ThreadPoolExecutor(max_workers=GEOCODE_MAX_WORKERS) as executor:
+            coordinates = dict(zip(
+                addresses,
+                executor.map(lambda address: self.get_coordinates(GOOGLE_API_KEY, address), addresses),
+            ))
+
+        sites, site_floors = [], []
+        for site_data in sites_data:
+            latitude, longitude = coordinates[site_data["address"]]
+            if latitude is None or longitude is None:
+                self.log_warning(f"Failed to fetch GPS coordinates for {site_data['site_name']}. Skipping.")
+                continue
+            sites.append(Site(
+                name=site_data["site_name"],
+                slug=slugify(site_data["site_name"]),
+                tenant=tenant,
+                region=region,
+                status="planned",
+                physical_address=site_data["address"],
+                latitude=latitude,
+                longitude=longitude,
+            ))
+            site_floors.append((site_data["lowest_floor"], site_data["number_of_floors"]))
+
+        if not sites:
+            self.log_warning("No sites to create.")
+            return
+
+        with transaction.atomic():
+            Site.objects.bulk_create(sites)
+
+            locations = [
+                self.build_floor(site, tenant, floor)
+                for site, (lowest_floor, number_of_floors) in zip(sites, site_floors)
+                for floor in range(lowest_floor, lowest_floor + number_of_floors)
+            ]
+            # bulk_create bypasses django-mptt: every floor is the root of a
+            # new tree, so number the new trees after the existing ones and
+            # rebuild only those instead of every location tree
+            next_tree_id = (Location.objects.aggregate(Max("tree_id"))["tree_id__max"] or 0) + 1
+            with Location.objects.disable_mptt_updates():
+                for tree_id, location in enumerate(locations, start=next_tree_id):
+                    location.tree_id = tree_id
+                    location.lft, location.rght, location.level = 1, 2, 0
+                Location.objects.bulk_create(locations)
+            for location in locations:
+                Location.objects.partial_rebuild(location.tree_id)
+
+            ChangeLog.log_bulk_changes(sites, ChangeLog.ObjectChangeActionChoices.ACTION_CREATE)
+            ChangeLog.log_bulk_changes(locations, ChangeLog.ObjectChangeActionChoices.ACTION_CREATE)
+
+        for site in sites:
+            self.log_success(f"Created site: [{site.name}]({NETBOX_URL}/dcim/sites/{site.id}).")
+        self.log_success(f"Created {len(locations)} locations for {len(sites)} sites.")
+
+        if commit:
+            self.trigger_pipeline(
+                "SITE_PIPELINE", GITLAB_API, GITLAB_TRIGGER_TOKEN, GITLAB_URL,
+                window=GITLAB_TRIGGER_WINDOW, sites=[site.name for site in sites],
+            )
         else:
             self.log_info("Commit is not set. Skipping GitLab pipeline trigger.")
 
-        self.log_success("All locations and site successfully created!")
\ No newline at end of file
+        self.log_success("All locations and sites successfully created!")
\ No newline at end of file
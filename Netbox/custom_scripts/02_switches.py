@@ -15,16 +15,21 @@ IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 or implied.
 """
 
-from extras.scripts import Script, ObjectVar, StringVar
+from extras.scripts import Script, ObjectVar, StringVar, BooleanVar
 from dcim.models import Site, Device, DeviceType, DeviceRole, Interface, InterfaceTemplate
 from tenancy.models import Tenant
-from scripts import CreateIps
-import requests
+from django.db import transaction
+from django.utils import timezone
+from scripts import ChangeLog, CreateIps, ScriptConfig
+from scripts.PipelineTrigger import PipelineTriggerMixin
 import re
+import time
 
+SWITCH_INDEX_RE = re.compile(r"-(\d+)$")
+SERIAL_SEPARATOR_RE = re.compile(r"[,\s]+")
 
 
-class AddSwitchesToSite(Script):
+class AddSwitchesToSite(PipelineTriggerMixin, Script):
     """
     Script to add one or more switches to an existing site in NetBox.
     """
@@ -37,7 +42,7 @@ class AddSwitchesToSite(Script):
 
         name = "Add Switches to Site"
         description = "Script to add one or more switches to an existing site."
-        field_order = ["tenant", "site", "device_type", "device_role","device_uplink","serial_numbers"]
+        field_order = ["tenant", "site", "device_type", "device_role","device_uplink","serial_numbers","bulk"]
 
     # Input variables
     tenant = ObjectVar(
@@ -73,6 +78,13 @@ class AddSwitchesToSite(Script):
         description="Enter one or more serial numbers, separated by commas.",
     )
 
+    bulk = BooleanVar(
+        label="Bulk Mode",
+        description="Create all switches in one transaction (for hundreds of serial numbers).",
+        default=False,
+        required=False,
+    )
+
     def run(self, data, commit):
         """
         Main execution method for adding switches to the site.
@@ -88,79 +100,106 @@ class AddSwitchesToSite(Script):
         device_uplink = data["device_uplink"]
         
         # Load the environment vars from JSON file
-        vars_data = self.load_json('vars.json')
-        GITLAB_API = vars_data.get("GITLAB_API")
-        GITLAB_URL = vars_data.get("GITLAB_URL")
-        GITLAB_TRIGGER_TOKEN = vars_data.get("GITLAB_TRIGGER_TOKEN") 
-        NETBOX_URL = vars_data.get("NETBOX_API")
+        config = ScriptConfig.load_config(
+            "NETBOX_API", *ScriptConfig.DNAC_KEYS, *(ScriptConfig.GITLAB_KEYS if commit else ())
+        )
+        GITLAB_API = config.gitlab_api
+        GITLAB_URL = config.gitlab_url
+        GITLAB_TRIGGER_TOKEN = config.gitlab_trigger_token
+        GITLAB_TRIGGER_WINDOW = config.gitlab_trigger_window
+        NETBOX_URL = config.netbox_api
         
         # Extract the site number from the site's name
         site_number_match = re.search(r"\d+$", site.name)
         site_number = site_number_match.group() if site_number_match else "unknown"
 
-        # Parse serial numbers from the input
-        serial_numbers = [sn.strip() for sn in data["serial_numbers"].split(",")]
+        timings = {}
+        phase_start = time.monotonic()
+
+        # Parse serial numbers from the input (commas, spaces or newlines)
+        serial_numbers = list(dict.fromkeys(
+            sn for sn in SERIAL_SEPARATOR_RE.split(data["serial_numbers"]) if sn
+        ))
 
         if not serial_numbers:
             self.log_warning("No serial numbers provided. Nothing to add.")
             return
 
-        # Get existing devices at the site to determine the next available index
-        existing_devices = Device.objects.filter(
-            site=site, name__startswith=f"sw{site_number}-"
+        # Look up all duplicates with one query
+        existing_serials = set(
+            Device.objects.filter(serial__in=serial_numbers).values_list("serial", flat=True)
         )
-        existing_indices = [
-            int(re.search(r"-(\d+)$", dev.name).group(1))
-            for dev in existing_devices
-            if re.search(r"-(\d+)$", dev.name)
-        ]
-        next_index = max(existing_indices, default=0) + 1
-
-        # Loop through the provided serial numbers and create devices
         for serial_number in serial_numbers:
-            # Check if the serial number already exists in the database
-            if Device.objects.filter(serial=serial_number).exists():
+            if serial_number in existing_serials:
                 self.log_warning(
                     f"A device with serial number {serial_number} already exists. Skipping."
                 )
-                continue
+        serial_numbers = [sn for sn in serial_numbers if sn not in existing_serials]
 
-            # Attempt to create the device
-            try:
-                device = Device.objects.create(
-                    name=f"sw{site_number}-{next_index}",
-                    tenant=tenant,
-                    site=site,
-                    device_type=device_type,
-                    role=device_role,
-                    serial=serial_number,
-                    status="planned",
-                    custom_field_data={"ccc_template_name": "Ansible_Day0-Template","ccc_pid":device_type.part_number},
-                )
-                # Fetch the existing interface
-                interface = Interface.objects.get(device=device, name=device_uplink.name)
-                # Update the label of the interface
-                interface.label = "Uplink"
-                interface.save()
-
-                self.log_success(
-                    f"Added switch with serial number [{serial_number}]({NETBOX_URL}/dcim/devices/{device.id}) to site [{site.name}]({NETBOX_URL}/dcim/sites/{site.id})."
-                )
-                next_index += 1
-            except Exception as e:
-                self.log_failure(
-                    f"Failed to add switch with serial number {serial_number}: {e} uplink: {device_uplink}."
-                )
-                continue
+        # Get existing devices at the site to determine the next available index
+        next_index = 1
+        for name in Device.objects.filter(
+            site=site, name__startswith=f"sw{site_number}-"
+        ).values_list("name", flat=True):
+            match = SWITCH_INDEX_RE.search(name)
+            if match:
+                next_index = max(next_index, int(match.group(1)) + 1)
+        created_device_ids = []
+        timings["lookup"] = time.monotonic() - phase_start
+
+        if data.get("bulk"):
+            created_device_ids = self.add_switches_bulk(
+                serial_numbers, next_index, site_number, data, NETBOX_URL, timings
+            )
+        else:
+            phase_start = time.monotonic()
+
+            # Loop through the provided serial numbers and create devices
+            for serial_number in serial_numbers:
+                # Attempt to create the device
+                try:
+                    device = Device.objects.create(
+                        name=f"sw{site_number}-{next_index}",
+                        tenant=tenant,
+                        site=site,
+                        device_type=device_type,
+                        role=device_role,
+                        serial=serial_number,
+                        status="planned",
+                        custom_field_data={"ccc_template_name": "Ansible_Day0-Template","ccc_pid":device_type.part_number},
+                    )
+                    # Fetch the existing interface
+                    interface = Interface.objects.get(device=device, name=device_uplink.name)
+                    # Update the label of the interface
+                    interface.label = "Uplink"
+                    interface.save()
+
+                    self.log_success(
+                        f"Added switch with serial number [{serial_number}]({NETBOX_URL}/dcim/devices/{device.id}) to site [{site.name}]({NETBOX_URL}/dcim/sites/{site.id})."
+                    )
+                    created_device_ids.append(device.id)
+                    next_index += 1
+                except Exception as e:
+                    self.log_failure(
+                        f"Failed to add switch with serial number {serial_number}: {e} uplink: {device_uplink}."
+                    )
+                    continue
+            timings["create"] = time.monotonic() - phase_start
 
-            # Execute the CreateIps script
-            self.log_info("Running the CreateIps script...")
+        # Assign IPs for all new switches at once, with one Catalyst Center client
+        phase_start = time.monotonic()
+        if created_device_ids:
+            self.log_info(f"Assigning IPs for {len(created_device_ids)} new switches...")
             try:
                 create_ips = CreateIps.CreateIps()
-                create_ips.run({"tenant": tenant}, commit=commit)
+                dnac = create_ips.get_dnac()
+                create_ips.assign_ips(
+                    tenant, dnac, device_ids=created_device_ids, bulk=data.get("bulk", False)
+                )
                 self.log_success("CreateIps script executed successfully.")
             except Exception as e:
                 self.log_failure(f"Failed to execute CreateIps script: {e}")
+        timings["ips"] = time.monotonic() - phase_start
 
 
         """
@@ -170,29 +209,78 @@ class AddSwitchesToSite(Script):
         """
         
         if commit:
-            self.log_info("Commit is set. Triggering GitLab pipeline...")
-            url = GITLAB_API
-            token = GITLAB_TRIGGER_TOKEN
-            
-            params = {
-                "token": token,
-                "variables[SWITCH_PIPELINE]": "true"
-            }
-
-            try:
-                response = requests.post(url, params=params)
-                response.raise_for_status()
-
-                if response.status_code == 201:
-                    self.log_success(f"[Pipeline]({GITLAB_URL}/-/pipelines/) triggered successfully.")
-                else:
-                    self.log_warning(
-                        f"Unexpected response status: {response.status_code}. Response: {response.text}"
-                    )
-            except requests.exceptions.RequestException as e:
-                self.log_failure(f"Failed to trigger pipeline: {e}")
+            device_names = Device.objects.filter(
+                id__in=created_device_ids
+            ).values_list("name", flat=True)
+            self.trigger_pipeline(
+                "SWITCH_PIPELINE", GITLAB_API, GITLAB_TRIGGER_TOKEN, GITLAB_URL,
+                window=GITLAB_TRIGGER_WINDOW, sites=[site.name], devices=list(device_names),
+            )
         else:
             self.log_info("Commit is not set. Skipping GitLab pipeline trigger.")
 
 
+        self.log_info(
+            "Timing: " + ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in timings.items())
+        )
         self.log_success("Finished adding switches to the site.")
+
+    def add_switches_bulk(self, serial_numbers, next_index, site_number, data, netbox_url, timings):
+        """
+        Create many switches in one transaction and label their uplinks in bulk.
+
+        Devices are still created one by one with Device.objects.create so that
+        NetBox instantiates their interfaces from the device type. The uplink
+        labels are then set with one query and one bulk_update.
+
+        :param serial_numbers: New serial numbers, already checked for duplicates.
+        :param next_index: First free switch index at the site.
+        :param site_number: Site number used in the device names.
+        :param data: Form data submitted by the user.
+        :param netbox_url: NetBox URL for the log links.
+        :param timings: Dict that receives the per-phase durations.
+        :return: List of the created device IDs; empty if the transaction failed.
+        """
+        site = data["site"]
+        device_type = data["device_type"]
+        device_uplink = data["device_uplink"]
+
+        try:
+            with transaction.atomic():
+                phase_start = time.monotonic()
+                devices = [
+                    Device.objects.create(
+                        name=f"sw{site_number}-{index}",
+                        tenant=data["tenant"],
+                        site=site,
+                        device_type=device_type,
+                        role=data["device_role"],
+                        serial=serial_number,
+                        status="planned",
+                        custom_field_data={"ccc_template_name": "Ansible_Day0-Template","ccc_pid":device_type.part_number},
+                    )
+                    for index, serial_number in enumerate(serial_numbers, start=next_index)
+                ]
+                timings["create"] = time.monotonic() - phase_start
+
+                phase_start = time.monotonic()
+                uplinks = list(Interface.objects.filter(device__in=devices, name=device_uplink.name))
+                if len(uplinks) != len(devices):
+                    raise ValueError(f"uplink {device_uplink} missing on {len(devices) - len(uplinks)} device(s)")
+                now = timezone.now()
+                for interface in uplinks:
+                    interface.snapshot()
+                    interface.label = "Uplink"
+                    interface.last_updated = now
+                Interface.objects.bulk_update(uplinks, ["label", "last_updated"])
+                ChangeLog.log_bulk_changes(uplinks, ChangeLog.ObjectChangeActionChoices.ACTION_UPDATE)
+                timings["uplinks"] = time.monotonic() - phase_start
+        except Exception as e:
+            self.log_failure(f"Failed to add {len(serial_numbers)} switches, nothing was created: {e}")
+            return []
+
+        for device in devices:
+            self.log_success(
+                f"Added switch with serial number [{device.serial}]({netbox_url}/dcim/devices/{device.id}) to site [{site.name}]({netbox_url}/dcim/sites/{site.id})."
+            )
+        return [device.id for device in devices]
@@ -0,0 +1,55 @@
+"""
+Copyright (c) 2026 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.1 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied.
+"""
+
+from netbox.context import current_request
+
+try:
+    from core.choices import ObjectChangeActionChoices
+    from core.models import ObjectChange
+except ImportError:  # NetBox < 4.1
+    from extras.choices import ObjectChangeActionChoices
+    from extras.models import ObjectChange
+
+
+def log_bulk_changes(objects, action):
+    """
+    Record changelog entries for objects written with bulk queries.
+
+    bulk_create/bulk_update bypass the model signals that normally write the
+    changelog and search cache. For updates, call snapshot() on each object
+    before changing it so the pre-change data is recorded.
+
+    :param objects: Saved model instances, all of the same model (the search
+                    cache indexes them with the indexer of the first one).
+    :param action: ObjectChangeActionChoices value.
+    """
+    request = current_request.get()
+    changes = []
+    for obj in objects:
+        change = obj.to_objectchange(action)
+        if request is not None:
+            change.user = request.user
+            change.user_name = request.user.username
+            change.request_id = request.id
+        changes.append(change)
+    ObjectChange.objects.bulk_create(changes)
+
+    try:
+        from netbox.search.backends import search_backend
+        search_backend.cache(objects)
+    except ImportError:
+        pass
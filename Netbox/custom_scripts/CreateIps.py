@@ -15,38 +15,159 @@ IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 or implied.
 """
 
-from extras.scripts import Script, ObjectVar
+from extras.scripts import Script, ObjectVar, BooleanVar
 from dcim.models import Device, Interface
 from ipam.models import IPAddress, Prefix, VLAN
 from tenancy.models import Tenant
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from scripts import ScriptConfig
+from scripts.ChangeLog import ObjectChangeActionChoices, log_bulk_changes
 import requests
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
 import logging
+import os
+import threading
+import time
+
+# Serial numbers per PnP device list request
+PNP_CHUNK_SIZE = 50
+# Concurrent PnP list requests
+PNP_MAX_WORKERS = 4
+# Catalyst Center tokens are valid for 60 minutes; refresh a bit earlier
+TOKEN_TTL = 55 * 60
+
+
+class TokenCache:
+    """
+    Cache for Catalyst Center auth tokens shared by all Dnac instances.
+
+    Tokens are always kept in process memory. A backend can be configured to
+    share them across script runs and NetBox workers:
+
+    - "django": the NetBox (Django) cache, e.g. Redis
+    - any other value: path of a JSON file readable only by the owner
+    """
+
+    _memory = {}
+    _lock = threading.Lock()
+
+    def __init__(self, backend=None) -> None:
+        self.backend = backend
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            token, expires_at = self._memory.get(key, (None, 0))
+        if token and expires_at > now:
+            return token
+
+        if not self.backend:
+            return None
+        if self.backend == "django":
+            from django.core.cache import cache
+            entry = cache.get(key)
+            # Entries are (token, expires_at); anything else is from an older version
+            token, expires_at = entry if isinstance(entry, (list, tuple)) else (None, 0)
+        else:
+            token, expires_at = self._read_file().get(key, (None, 0))
+        if token and expires_at > now:
+            with self._lock:
+                self._memory[key] = (token, expires_at)
+            return token
+        return None
+
+    def set(self, key: str, token: str, ttl: int = TOKEN_TTL) -> None:
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._memory[key] = (token, expires_at)
+
+        if self.backend == "django":
+            from django.core.cache import cache
+            cache.set(key, (token, expires_at), ttl)
+        elif self.backend:
+            tokens = self._read_file()
+            tokens[key] = (token, expires_at)
+            self._write_file(tokens)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+
+        if self.backend == "django":
+            from django.core.cache import cache
+            cache.delete(key)
+        elif self.backend:
+            tokens = self._read_file()
+            if tokens.pop(key, None):
+                self._write_file(tokens)
+
+    def _read_file(self) -> dict:
+        try:
+            with open(self.backend) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_file(self, tokens: dict) -> None:
+        tmp_path = f"{self.backend}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(tokens, f)
+            os.replace(tmp_path, self.backend)
+        except OSError as e:
+            logging.warning(f"Could not write token cache {self.backend}: {e}")
+
 
 class Dnac:
     """
     Class to manage interactions with Cisco Catalyst Center (DNAC) using the requests library.
     Provides methods to retrieve device information, such as IP addresses.
+
+    Auth and data calls share one pooled session with retry/backoff. Tokens are
+    reused from the TokenCache and refreshed transparently on a 401 response.
     """
 
-    def __init__(self, host, user, password) -> None:
+    def __init__(self, host, user, password, token_cache=None) -> None:
         """
         Initialize DNAC session using provided credentials.
+
+        :param token_cache: TokenCache backend, see TokenCache ("django" or a file path).
         """
         self.host = host
         self.user = user
         self.password = password
         self.base_url = f"https://{self.host}/dna/intent/api/v1"
-        self.token = self.get_token()
+        self.token_cache = TokenCache(token_cache)
+        self.token_key = "dnac-token:" + hashlib.sha256(f"{host}|{user}".encode()).hexdigest()
+        self.token_lock = threading.Lock()
+
+        retry = Retry(
+            total=3,
+            backoff_factor=1,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "POST"),
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=PNP_MAX_WORKERS)
         self.session = requests.Session()
-        self.session.headers.update({"x-auth-token": self.token})
+        self.session.mount("https://", adapter)
         self.session.verify = False  # Consider enabling SSL verification
         logging.basicConfig(level=logging.INFO)
 
+        self.token = self.token_cache.get(self.token_key) or self.refresh_token()
+        self.session.headers.update({"x-auth-token": self.token})
+
     def get_token(self) -> str:
         url = f"https://{self.host}/dna/system/api/v1/auth/token"
         try:
-            response = requests.post(url, auth=HTTPBasicAuth(self.user, self.password), verify=False)  # Change verify to True with valid certificates
+            response = self.session.post(url, auth=HTTPBasicAuth(self.user, self.password))
             response.raise_for_status()
             return response.json()["Token"]
         except requests.exceptions.HTTPError as e:
@@ -56,6 +177,33 @@ class Dnac:
             logging.error(f"An unexpected error occurred: {e}")
             raise
 
+    def refresh_token(self, expired_token=None) -> str:
+        """
+        Fetch a new token and store it in the token cache.
+
+        :param expired_token: Token that was rejected; if another thread has
+                              already replaced it, the new token is reused.
+        :return: The current token.
+        """
+        with self.token_lock:
+            if expired_token and getattr(self, "token", None) != expired_token:
+                return self.token
+            self.token_cache.delete(self.token_key)
+            self.token = self.get_token()
+            self.token_cache.set(self.token_key, self.token)
+            self.session.headers.update({"x-auth-token": self.token})
+            return self.token
+
+    def _get(self, url, **kwargs):
+        """GET through the shared session, refreshing the token once on 401."""
+        token = self.token
+        response = self.session.get(url, **kwargs)
+        if response.status_code == 401:
+            logging.info("Catalyst Center token rejected, refreshing")
+            self.refresh_token(expired_token=token)
+            response = self.session.get(url, **kwargs)
+        return response
+
     def get_device_ip_address(self, device_serial: str) -> str:
         """
         Retrieve the IP address of a device by its serial number.
@@ -69,18 +217,13 @@ class Dnac:
             params = {"serialNumber": device_serial}
 
             # Perform the GET request using the session with token in headers
-            response = self.session.get(url, params=params)
+            response = self._get(url, params=params)
 
             response.raise_for_status()  # Raises an HTTPError for bad responses
 
             devices = response.json()
             if devices:
-                # Extract IP address from the device's HTTP headers
-                ip_address = next(
-                    header["value"]
-                    for header in devices[0]["deviceInfo"]["httpHeaders"]
-                    if "value" in header
-                )
+                ip_address = self._ip_from_pnp_device(devices[0])
 
         except requests.exceptions.HTTPError as e:
             logging.error(f"Failed to get device list for {device_serial}: {e} - Response: {e.response.text}")
@@ -89,6 +232,57 @@ class Dnac:
 
         return ip_address
 
+    def get_device_ip_addresses(self, device_serials: list) -> dict:
+        """
+        Retrieve the IP addresses of many devices by serial number.
+
+        The PnP device list is queried for up to PNP_CHUNK_SIZE serial numbers
+        per request, with up to PNP_MAX_WORKERS requests in flight.
+
+        :param device_serials: The serial numbers of the devices.
+        :return: Dict of serial number to IP address for the devices found.
+        """
+        serials = list(dict.fromkeys(serial for serial in device_serials if serial))
+        chunks = [serials[i:i + PNP_CHUNK_SIZE] for i in range(0, len(serials), PNP_CHUNK_SIZE)]
+        ip_addresses = {}
+        if not chunks:
+            return ip_addresses
+
+        with ThreadPoolExecutor(max_workers=min(PNP_MAX_WORKERS, len(chunks))) as executor:
+            for devices in executor.map(self._get_pnp_devices, chunks):
+                for device in devices:
+                    serial = device.get("deviceInfo", {}).get("serialNumber")
+                    ip_address = self._ip_from_pnp_device(device)
+                    if serial and ip_address:
+                        ip_addresses[serial] = ip_address
+
+        return ip_addresses
+
+    def _get_pnp_devices(self, serials: list) -> list:
+        url = f"{self.base_url}/onboarding/pnp-device"
+        params = {"serialNumber": serials, "limit": len(serials)}
+        try:
+            response = self._get(url, params=params)
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.HTTPError as e:
+            logging.error(f"Failed to get device list for {', '.join(serials)}: {e} - Response: {e.response.text}")
+        except Exception as e:
+            logging.error(f"Error getting device list for {', '.join(serials)}: {e}")
+        return []
+
+    @staticmethod
+    def _ip_from_pnp_device(device: dict) -> str:
+        """Extract the IP address from a PnP device's HTTP headers."""
+        return next(
+            (
+                header["value"]
+                for header in device.get("deviceInfo", {}).get("httpHeaders", [])
+                if "value" in header
+            ),
+            "",
+        )
+
 
 class CreateIps(Script):
     """
@@ -109,6 +303,13 @@ class CreateIps(Script):
         model=Tenant, label="Tenant", description="Select the tenant for the new site."
     )
 
+    bulk = BooleanVar(
+        label="Bulk Mode",
+        description="Create interfaces and IPs with bulk inserts (for many devices).",
+        default=False,
+        required=False,
+    )
+
     def run(self, data, commit):
         """
         Main execution method to process devices and assign network settings.
@@ -119,23 +320,52 @@ class CreateIps(Script):
 
         self.log_info("Starting the script...")
 
-        # Load configuration from JSON file
-        vars_data = self.load_json('vars.json')
-        dnac_host = vars_data.get("DNAC_HOST")
-        dnac_user = vars_data.get("DNAC_USER")
-        dnac_password = vars_data.get("DNAC_PASSWORD")
+        dnac = self.get_dnac()
+        self.assign_ips(data["tenant"], dnac, bulk=data.get("bulk", False))
+
+        self.log_success("Script completed successfully!")
+
+    def get_dnac(self) -> Dnac:
+        """
+        Create a Catalyst Center client from the settings in vars.json.
+
+        :return: Authenticated Dnac instance.
+        """
+        # Configuration is read once per worker and cached (see ScriptConfig)
+        config = ScriptConfig.load_config(*ScriptConfig.DNAC_KEYS)
 
         # Initialize DNAC instance with credentials
-        dnac = Dnac(dnac_host, dnac_user, dnac_password)
+        return Dnac(
+            config.dnac_host, config.dnac_user, config.dnac_password,
+            token_cache=config.dnac_token_cache,
+        )
+
+    def assign_ips(self, tenant, dnac, device_ids=None, bulk=False):
+        """
+        Create MGMT interfaces, prefixes and primary IPs for planned devices.
 
+        :param tenant: Tenant for the new prefixes and IPs.
+        :param dnac: Authenticated Dnac instance, shared by the caller.
+        :param device_ids: Only handle these devices; None handles every
+                           planned device without a primary IP.
+        :param bulk: Use the bulk insert path (see create_ips_bulk).
+        """
         devices = Device.objects.filter(status="planned", primary_ip4=None)
-        tenant = data["tenant"]
+        if device_ids is not None:
+            devices = devices.filter(pk__in=device_ids)
+        devices = list(devices)
 
         vlan = VLAN.objects.get(name="MGMT")
 
+        # Resolve all serial numbers up front instead of one request per device
+        ip_addresses = dnac.get_device_ip_addresses([device.serial for device in devices])
+
+        if bulk:
+            self.create_ips_bulk(devices, ip_addresses, tenant, vlan)
+            return
+
         for device in devices:
-            # Get the device's IP address from DNAC using the correct argument
-            ip_address = dnac.get_device_ip_address(device.serial)
+            ip_address = ip_addresses.get(device.serial, "")
 
             if ip_address:
                 self.log_info(f"Found IP address {ip_address} for device {device.name}")
@@ -178,4 +408,104 @@ class CreateIps(Script):
             else:
                 self.log_warning(f"No IP address found for device {device.name}")
 
-        self.log_success("Script completed successfully!")
\ No newline at end of file
+    def create_ips_bulk(self, devices, ip_addresses, tenant, vlan):
+        """
+        Create MGMT interfaces, prefixes and primary IPs for many devices at once.
+
+        Uplink interfaces and existing prefixes are prefetched with one query
+        each. Interfaces and IPs are inserted with bulk_create and the primary
+        IPs set with bulk_update in one transaction. New prefixes (usually one
+        per site) are still saved individually so NetBox maintains the prefix
+        hierarchy. Changelog entries, search cache entries and the devices'
+        interface counts are updated explicitly, since bulk queries bypass
+        the model signals.
+
+        :param devices: Planned devices without a primary IP.
+        :param ip_addresses: Dict of serial number to IP address from Catalyst Center.
+        :param tenant: Tenant for the new prefixes and IPs.
+        :param vlan: VLAN assigned to new prefixes.
+        """
+        for device in devices:
+            if not ip_addresses.get(device.serial):
+                self.log_warning(f"No IP address found for device {device.name}")
+        devices = [device for device in devices if ip_addresses.get(device.serial)]
+        if not devices:
+            return
+
+        uplinks = {
+            interface.device_id: interface
+            for interface in Interface.objects.filter(device__in=devices, label="Uplink")
+        }
+        for device in devices:
+            if device.pk not in uplinks:
+                self.log_failure(f"No uplink interface found for device {device.name}")
+        devices = [device for device in devices if device.pk in uplinks]
+
+        device_prefixes = {
+            device.pk: f"{'.'.join(ip_addresses[device.serial].split('.')[:3])}.0/24"
+            for device in devices
+        }
+        existing_prefixes = {
+            str(prefix.prefix)
+            for prefix in Prefix.objects.filter(prefix__in=set(device_prefixes.values()))
+        }
+
+        with transaction.atomic():
+            for parent_prefix in sorted(set(device_prefixes.values()) - existing_prefixes):
+                Prefix.objects.create(
+                    prefix=parent_prefix,
+                    tenant=tenant,
+                    vlan=vlan,
+                    status="active",
+                )
+                self.log_success(f"Created parent prefix {parent_prefix}.")
+
+            interfaces = []
+            for device in devices:
+                interface = Interface(
+                    device=device,
+                    name="Vlan1",
+                    type="virtual",
+                    label="MGMT",
+                    enabled=True,
+                    parent=uplinks[device.pk],
+                )
+                # Denormalized scope fields are normally set in save()
+                for field in ("_site", "_location", "_rack"):
+                    if hasattr(interface, field):
+                        setattr(interface, field, getattr(device, field[1:]))
+                interfaces.append(interface)
+            Interface.objects.bulk_create(interfaces)
+            # The interface counter cache is normally updated by post_save
+            if hasattr(Device, "interface_count"):
+                Device.objects.filter(pk__in=[device.pk for device in devices]).update(
+                    interface_count=F("interface_count") + 1
+                )
+
+            ip_objs = [
+                IPAddress(
+                    address=f"{ip_addresses[device.serial]}/24",
+                    assigned_object=interface,
+                    tenant=tenant,
+                )
+                for device, interface in zip(devices, interfaces)
+            ]
+            IPAddress.objects.bulk_create(ip_objs)
+
+            now = timezone.now()
+            for device, ip_obj in zip(devices, ip_objs):
+                device.snapshot()
+                device.primary_ip4 = ip_obj
+                device.last_updated = now
+                if hasattr(device, "interface_count"):
+                    device.interface_count += 1
+            Device.objects.bulk_update(devices, ["primary_ip4", "last_updated"])
+
+            log_bulk_changes(interfaces, ObjectChangeActionChoices.ACTION_CREATE)
+            log_bulk_changes(ip_objs, ObjectChangeActionChoices.ACTION_CREATE)
+            log_bulk_changes(devices, ObjectChangeActionChoices.ACTION_UPDATE)
+
+        for device in devices:
+            ip_address = ip_addresses[device.serial]
+            self.log_success(f"Set primary IPv4 address {ip_address} for device {device.name}.")
+            self.log_success(f"Created MGMT SVI with IP {ip_address} for device {device.name}.")
@@ -0,0 +1,204 @@
+"""
+Copyright (c) 2026 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.1 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied.
+"""
+
+from datetime import timedelta
+import logging
+import requests
+
+# Seconds during which triggers of the same pipeline are combined into one.
+# Short enough not to be noticed after a single run, long enough to catch
+# scripts started back to back.
+DEFAULT_TRIGGER_WINDOW = 10
+# NetBox background queue that runs the delayed trigger
+TRIGGER_QUEUE = "low"
+# Pending targets are dropped if no worker picks up the trigger within a day
+PENDING_TTL = 24 * 3600
+
+
+def _keys(pipeline):
+    prefix = f"gitlab_trigger:{pipeline}"
+    return {
+        "count": f"{prefix}:count",
+        "sites": f"{prefix}:sites",
+        "devices": f"{prefix}:devices",
+        "scheduled": f"{prefix}:scheduled",
+    }
+
+
+def _get_queue():
+    import django_rq
+    return django_rq.get_queue(TRIGGER_QUEUE)
+
+
+def _scheduler_running(queue):
+    """Whether an RQ worker started with --with-scheduler serves the queue."""
+    try:
+        from rq.scheduler import RQScheduler
+    except ImportError:
+        # rq without the built-in scheduler gives no way to tell
+        return True
+    return bool(queue.connection.exists(RQScheduler.get_locking_key(queue.name)))
+
+
+def post_trigger(gitlab_api, gitlab_trigger_token, pipeline, sites=(), devices=()):
+    """
+    Trigger a GitLab pipeline.
+
+    :param gitlab_api: GitLab pipeline trigger API URL.
+    :param gitlab_trigger_token: GitLab pipeline trigger token.
+    :param pipeline: Pipeline variable set to "true", e.g. SITE_PIPELINE.
+    :param sites: Affected site names, passed as PIPELINE_SITES.
+    :param devices: Affected device names, passed as PIPELINE_DEVICES.
+    :return: The GitLab response.
+    """
+    params = {
+        "token": gitlab_trigger_token,
+        f"variables[{pipeline}]": "true"
+    }
+    if sites:
+        params["variables[PIPELINE_SITES]"] = ",".join(sorted(sites))
+    if devices:
+        params["variables[PIPELINE_DEVICES]"] = ",".join(sorted(devices))
+
+    response = requests.post(gitlab_api, params=params, timeout=30)
+    response.raise_for_status()
+    return response
+
+
+def queue_trigger(pipeline, gitlab_api, gitlab_trigger_token, window=DEFAULT_TRIGGER_WINDOW,
+                  sites=(), devices=()):
+    """
+    Queue a pipeline trigger, combining it with others of the same pipeline.
+
+    The affected sites and devices are added to sets in Redis. The first
+    trigger within a window schedules flush_trigger() on the NetBox task
+    queue after `window` seconds; later triggers only extend the sets, so the
+    whole window results in one pipeline carrying the union of targets.
+
+    :return: True if this call scheduled a new pipeline, False if it was
+             merged, None if no RQ scheduler would run the delayed trigger.
+    """
+    queue = _get_queue()
+    if not _scheduler_running(queue):
+        return None
+    redis = queue.connection
+    keys = _keys(pipeline)
+
+    pipe = redis.pipeline()
+    pipe.incr(keys["count"])
+    if sites:
+        pipe.sadd(keys["sites"], *sites)
+    if devices:
+        pipe.sadd(keys["devices"], *devices)
+    for key in ("count", "sites", "devices"):
+        pipe.expire(keys[key], PENDING_TTL)
+    pipe.execute()
+
+    # The flag outlives the window a little so a busy worker does not cause
+    # a second schedule; a late duplicate finds nothing pending and is a no-op
+    if not redis.set(keys["scheduled"], 1, nx=True, ex=window + 60):
+        return False
+
+    queue.enqueue_in(
+        timedelta(seconds=window), flush_trigger, pipeline, gitlab_api, gitlab_trigger_token
+    )
+    return True
+
+
+def flush_trigger(pipeline, gitlab_api, gitlab_trigger_token):
+    """
+    Trigger one pipeline for everything queued since the last flush.
+
+    Runs as a background job on the NetBox worker.
+    """
+    redis = _get_queue().connection
+    keys = _keys(pipeline)
+
+    pipe = redis.pipeline()
+    pipe.get(keys["count"])
+    pipe.smembers(keys["sites"])
+    pipe.smembers(keys["devices"])
+    pipe.delete(*keys.values())
+    count, sites, devices, _ = pipe.execute()
+
+    if not count:
+        return None
+
+    sites = {site.decode() for site in sites}
+    devices = {device.decode() for device in devices}
+    response = post_trigger(gitlab_api, gitlab_trigger_token, pipeline, sites, devices)
+    logging.info(
+        f"Triggered {pipeline} for {int(count)} queued requests "
+        f"({len(sites)} sites, {len(devices)} devices)"
+    )
+    return response.status_code
+
+
+class PipelineTriggerMixin:
+    """
+    GitLab pipeline trigger shared by the custom scripts.
+    """
+
+    def trigger_pipeline(self, pipeline, gitlab_api, gitlab_trigger_token, gitlab_url,
+                         window=0, sites=(), devices=()):
+        """
+        Trigger a GitLab pipeline, directly or through the coalescing queue.
+
+        :param pipeline: Pipeline variable, e.g. SITE_PIPELINE or SWITCH_PIPELINE.
+        :param gitlab_api: GitLab pipeline trigger API URL.
+        :param gitlab_trigger_token: GitLab pipeline trigger token.
+        :param gitlab_url: GitLab project URL for the log link.
+        :param window: Seconds to combine triggers over, 0 to trigger immediately.
+        :param sites: Affected site names.
+        :param devices: Affected device names.
+        """
+        self.log_info("Commit is set. Triggering GitLab pipeline...")
+
+        if window:
+            try:
+                scheduled = queue_trigger(
+                    pipeline, gitlab_api, gitlab_trigger_token, window, sites, devices
+                )
+            except Exception as e:
+                self.log_warning(f"Could not queue pipeline trigger ({e}), triggering directly.")
+            else:
+                if scheduled is None:
+                    self.log_info(
+                        f"No RQ scheduler runs the {TRIGGER_QUEUE} queue, triggering directly."
+                    )
+                elif scheduled:
+                    self.log_success(
+                        f"[Pipeline]({gitlab_url}/-/pipelines/) will be triggered in {window}s."
+                    )
+                else:
+                    self.log_success(
+                        f"Added to the [pipeline]({gitlab_url}/-/pipelines/) already queued."
+                    )
+                if scheduled is not None:
+                    return
+
+        try:
+            response = post_trigger(gitlab_api, gitlab_trigger_token, pipeline, sites, devices)
+
+            if response.status_code == 201:
+                self.log_success(f"[Pipeline]({gitlab_url}/-/pipelines/) triggered successfully.")
+            else:
+                self.log_warning(
+                    f"Unexpected response status: {response.status_code}. Response: {response.text}"
+                )
+        except requests.exceptions.RequestException as e:
+            self.log_failure(f"Failed to trigger pipeline: {e}")
@@ -0,0 +1,155 @@
+"""
+Copyright (c) 2026 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.1 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied.
+"""
+
+from dataclasses import dataclass, field
+from typing import Optional
+from django.conf import settings
+from scripts.PipelineTrigger import DEFAULT_TRIGGER_WINDOW
+import json
+import os
+import threading
+
+try:
+    from utilities.exceptions import AbortScript
+except ImportError:  # NetBox < 3.4
+    AbortScript = Exception
+
+CONFIG_FILE = "vars.json"
+
+
+def _bool(value):
+    if isinstance(value, str):
+        if value.lower() not in ("true", "false", "1", "0", "yes", "no"):
+            raise ValueError(value)
+        return value.lower() in ("true", "1", "yes")
+    return bool(value)
+
+
+# vars.json key and type for each ScriptConfig field
+FIELDS = {
+    "google_api_key": ("GOOGLE_API_KEY", str),
+    "gitlab_api": ("GITLAB_API", str),
+    "gitlab_url": ("GITLAB_URL", str),
+    "gitlab_trigger_token": ("GITLAB_TRIGGER_TOKEN", str),
+    "gitlab_trigger_window": ("GITLAB_TRIGGER_WINDOW", int),
+    "dnac_host": ("DNAC_HOST", str),
+    "dnac_user": ("DNAC_USER", str),
+    "dnac_password": ("DNAC_PASSWORD", str),
+    "dnac_token_cache": ("DNAC_TOKEN_CACHE", str),
+    "netbox_api": ("NETBOX_API", str),
+    "geocode_cache": ("GEOCODE_CACHE", str),
+    "geocode_cache_ttl": ("GEOCODE_CACHE_TTL", int),
+    "geocode_fixtures": ("GEOCODE_FIXTURES", str),
+    "geocode_offline": ("GEOCODE_OFFLINE", _bool),
+}
+
+# Keys each script needs; the GitLab keys are only needed when committing
+GITLAB_KEYS = ("GITLAB_API", "GITLAB_URL", "GITLAB_TRIGGER_TOKEN")
+DNAC_KEYS = ("DNAC_HOST", "DNAC_USER", "DNAC_PASSWORD")
+
+
+class ConfigError(AbortScript):
+    """vars.json is missing, unreadable or lacks required keys."""
+
+
+@dataclass(frozen=True)
+class ScriptConfig:
+    """
+    Typed view of vars.json.
+
+    Optional keys that are not set are None, except the flags, which
+    default to off, and the trigger window (see PipelineTrigger).
+    """
+
+    google_api_key: Optional[str] = None
+    gitlab_api: Optional[str] = None
+    gitlab_url: Optional[str] = None
+    gitlab_trigger_token: Optional[str] = None
+    gitlab_trigger_window: int = DEFAULT_TRIGGER_WINDOW
+    dnac_host: Optional[str] = None
+    dnac_user: Optional[str] = None
+    dnac_password: Optional[str] = None
+    dnac_token_cache: Optional[str] = None
+    netbox_api: Optional[str] = None
+    geocode_cache: Optional[str] = None
+    geocode_cache_ttl: Optional[int] = None
+    geocode_fixtures: Optional[str] = None
+    geocode_offline: bool = False
+    raw: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScriptConfig":
+        values = {}
+        for name, (key, type_) in FIELDS.items():
+            value = data.get(key)
+            if value is None or value == "":
+                continue
+            try:
+                values[name] = type_(value)
+            except (TypeError, ValueError):
+                raise ConfigError(f"{CONFIG_FILE}: invalid value for {key}: {value!r}")
+        return cls(raw=data, **values)
+
+    def require(self, *keys) -> "ScriptConfig":
+        """
+        Fail fast if any of the given vars.json keys is missing or empty.
+
+        :return: self, for chaining.
+        """
+        missing = [key for key in keys if self.raw.get(key) in (None, "")]
+        if missing:
+            raise ConfigError(f"{CONFIG_FILE} is missing required keys: {', '.join(missing)}")
+        return self
+
+
+# Parsed config per file path, with the mtime it was read at
+_cache = {}
+_lock = threading.Lock()
+
+
+def load_config(*required, filename=CONFIG_FILE) -> ScriptConfig:
+    """
+    Load vars.json from the scripts directory, once per worker process.
+
+    The parsed file is cached and only re-read when its modification time
+    changes, so repeated script runs and nested scripts (CreateIps called
+    from 02_switches) share one copy.
+
+    :param required: vars.json keys that must be set.
+    :param filename: File name relative to SCRIPTS_ROOT.
+    :return: ScriptConfig instance.
+    """
+    path = os.path.join(settings.SCRIPTS_ROOT, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as e:
+        raise ConfigError(f"Cannot read {path}: {e}")
+
+    with _lock:
+        cached = _cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1].require(*required)
+
+    try:
+        with open(path) as f:
+            config = ScriptConfig.from_dict(json.load(f))
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"Cannot load {path}: {e}")
+
+    with _lock:
+        _cache[path] = (mtime, config)
+    return config.require(*required)
@@ -0,0 +1,383 @@
+"""
+Compute the minimal set of configuration commands that still need to be sent.
+
+The running configuration is parsed into a tree indexed by line text, so
+checking whether a requested command is already present is a dictionary lookup
+per line. Requested commands may be indented like a running config, or a flat
+list where section commands (interface, router, line, ...) open a section
+that lasts until "exit" or the next section command.
+
+Indented commands are the reliable form: their sections are explicit. In a
+flat list, a sub-mode command not listed in SECTION_KEYWORDS looks like a
+global command, so its children cannot be told apart from global commands.
+When the top-level command before a missing top-level command of a flat list
+has children in the running config, it is a sub-mode on the device and is sent
+again first, in case the missing command belongs to it.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+# The running config is fetched for every diff unless a TTL is set: a cached
+# copy misses changes made since by other tools or by hand
+DEFAULT_CACHE_TTL = 0
+DEFAULT_CACHE_DIR = '/tmp/push_config_cache'
+
+# Top-level commands that enter a configuration sub-mode
+SECTION_KEYWORDS = (
+    'interface ', 'router ', 'line ', 'vlan ', 'vrf definition ', 'ip access-list ',
+    'ipv6 access-list ', 'route-map ', 'class-map ', 'policy-map ', 'aaa group server ',
+    'ip dhcp pool ', 'key chain ', 'crypto pki trustpoint ', 'track ', 'snmp-server view ',
+    'flow record ', 'flow exporter ', 'flow monitor ', 'archive', 'control-plane',
+    'redundancy', 'spanning-tree mst configuration', 'netconf-yang', 'restconf',
+    'radius server ', 'tacacs server ', 'ldap server ', 'aaa server radius dynamic-author',
+    'ip sla ', 'ipv6 dhcp pool ', 'ipv6 router ', 'ip vrf ', 'mac access-list ',
+    'object-group ', 'crypto isakmp policy ', 'crypto isakmp profile ', 'crypto ipsec profile ',
+    'crypto map ', 'crypto keyring ', 'crypto ikev2 ', 'crypto pki certificate chain ',
+    'parameter-map ', 'zone security ', 'zone-pair ', 'event manager applet ',
+    'device-tracking policy ', 'ip http client ', 'call-home', 'template ',
+)
+
+# Commands that enter a nested sub-mode, by the section they appear in
+SUBSECTION_KEYWORDS = {
+    'router ': ('address-family ',),
+    'vrf definition ': ('address-family ',),
+    'policy-map ': ('class ',),
+}
+
+EXIT_COMMANDS = ('exit', 'exit-address-family', 'end', '!')
+
+IGNORED_PREFIXES = ('Building configuration', 'Current configuration', '!', 'end')
+
+
+class ConfigNode:
+    """A configuration line and its children, indexed by their text."""
+
+    __slots__ = ('text', 'children')
+
+    def __init__(self, text=''):
+        self.text = text
+        self.children = {}
+
+    def add(self, text: str) -> 'ConfigNode':
+        node = self.children.get(text)
+        if node is None:
+            node = self.children[text] = ConfigNode(text)
+        return node
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(' '))
+
+
+def parse_config(config_text: str) -> ConfigNode:
+    """
+    Parse a running-config into a tree based on indentation.
+
+    Args:
+        config_text: Output of "show running-config"
+
+    Returns:
+        root ConfigNode whose children are the top-level commands
+    """
+    root = ConfigNode()
+    stack = [(-1, root)]
+    lines = iter(config_text.splitlines())
+
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or line.startswith(IGNORED_PREFIXES):
+            continue
+
+        # Banners span several lines up to the delimiter; keep them as one node
+        if stripped.startswith('banner '):
+            parts = stripped.split()
+            delimiter = parts[2][:2] if len(parts) > 2 else ''
+            banner = [stripped]
+            if delimiter and stripped.count(delimiter) < 2:
+                for banner_line in lines:
+                    banner.append(banner_line)
+                    if delimiter in banner_line:
+                        break
+            root.add('\n'.join(banner))
+            stack = [(-1, root)]
+            continue
+
+        indent = _indent(line)
+        while stack[-1][0] >= indent:
+            stack.pop()
+        node = stack[-1][1].add(stripped)
+        stack.append((indent, node))
+
+    return root
+
+
+def _is_indented(config_commands: list) -> bool:
+    return any(cmd != cmd.lstrip() for cmd in config_commands)
+
+
+def _opens_subsection(section: str, cmd: str) -> bool:
+    return any(
+        section.startswith(parent) and cmd.startswith(children)
+        for parent, children in SUBSECTION_KEYWORDS.items()
+    )
+
+
+def _opens_section(stack: list) -> bool:
+    """Whether the last line on an indentation stack can have children."""
+    if len(stack) == 1:
+        return True
+    return len(stack) == 2 and _opens_subsection(stack[0][1], stack[1][1])
+
+
+def parse_commands(config_commands: list) -> list:
+    """
+    Turn requested commands into (path, command) pairs.
+
+    path is the tuple of parent section lines the command lives under, so
+    "description Uplink" after "interface Gi1/0/1" becomes
+    (("interface Gi1/0/1",), "description Uplink").
+
+    Indented commands follow their indentation, except that SECTION_KEYWORDS
+    lines are always top-level and only sections and known sub-sections have
+    children, so template indentation that is only cosmetic does not nest
+    commands. "exit" leaves the section it is indented under. "!" restarts
+    the indentation but, like on the device, does not leave the section.
+
+    In a flat list, an exit command outside any known section is returned as
+    (None, command): it ends the sub-mode of a command compute_delta() could
+    not identify as a section.
+    """
+    indented = _is_indented(config_commands)
+    parsed = []
+    path = []
+
+    if indented:
+        stack = []
+        # Section the device is still in after a "!": a comment does not
+        # leave the mode, so indented lines right after it belong to it
+        mode = None
+        for cmd in config_commands:
+            stripped = cmd.strip()
+            if not stripped:
+                continue
+            indent = _indent(cmd)
+            if stripped == '!':
+                if len(stack) > 1 or (stack and stack[0][1].startswith(SECTION_KEYWORDS)):
+                    mode = stack[0][1]
+                stack = []
+                continue
+            if stripped in EXIT_COMMANDS:
+                # Leave the section the exit is indented under, or at the
+                # level of ("exit-address-family" in a running config)
+                left = False
+                while stack and stack[-1][0] >= indent:
+                    left = _opens_section(stack)
+                    stack.pop()
+                if stack and not left:
+                    stack.pop()
+                if stripped == 'end':
+                    stack = []
+                mode = None
+                continue
+            if stripped.startswith(SECTION_KEYWORDS):
+                # Always top-level, whatever the template's indentation
+                stack, mode = [], None
+            else:
+                while stack and (stack[-1][0] >= indent or not _opens_section(stack)):
+                    stack.pop()
+                if not stack and mode is not None and indent > 0:
+                    stack = [(indent - 1, mode)]
+                elif not stack:
+                    mode = None
+            parsed.append((tuple(text for _, text in stack), stripped))
+            stack.append((indent, stripped))
+        return parsed
+
+    for cmd in config_commands:
+        stripped = cmd.strip()
+        if not stripped:
+            continue
+        if stripped in EXIT_COMMANDS:
+            if not path:
+                parsed.append((None, stripped))
+            elif stripped == 'end':
+                path = []
+            else:
+                path.pop()
+            continue
+        if stripped.startswith(SECTION_KEYWORDS):
+            path = []
+            parsed.append(((), stripped))
+            path.append(stripped)
+        elif path and _opens_subsection(path[0], stripped):
+            path = path[:1]
+            parsed.append((tuple(path), stripped))
+            path.append(stripped)
+        else:
+            parsed.append((tuple(path), stripped))
+
+    return parsed
+
+
+def _lookup(tree: ConfigNode, path: tuple):
+    node = tree
+    for text in path:
+        node = node.children.get(text)
+        if node is None:
+            return None
+    return node
+
+
+def compute_delta(tree: ConfigNode, config_commands: list) -> list:
+    """
+    Return the requested commands that are not yet in the running config.
+
+    Section commands are re-emitted before any missing child, and "exit" is
+    added after the children of nested sections so the device returns to the
+    right mode. An empty list means nothing needs to be pushed.
+
+    Args:
+        tree: Parsed running config from parse_config()
+        config_commands: Requested configuration commands
+
+    Returns:
+        list of commands to send
+    """
+    parsed = parse_commands(config_commands)
+    flat = not _is_indented(config_commands)
+    sections = {path for path, _ in parsed if path is not None}
+    delta = []
+    current_path = ()
+    # Flat lists only: the previous top-level command, whether it was sent,
+    # and whether anything was sent since the last exit or known section
+    previous_top, previous_sent, run_sent = None, False, False
+
+    def enter(path):
+        nonlocal current_path
+        if path == current_path:
+            return
+        # Leave the modes the next command is not part of, then enter its own
+        common = 0
+        while (common < len(path) and common < len(current_path)
+               and path[common] == current_path[common]):
+            common += 1
+        delta.extend(['exit'] * (len(current_path) - common))
+        delta.extend(path[common:])
+        current_path = path
+
+    for path, cmd in parsed:
+        if path is None:
+            # End of an unidentified sub-mode; only leave it if it was entered
+            if cmd == 'exit' and run_sent and current_path == ():
+                delta.append('exit')
+            previous_top, previous_sent, run_sent = None, False, False
+            continue
+
+        parent = _lookup(tree, path)
+        present = parent is not None and cmd in parent.children
+
+        opens_section = path + (cmd,) in sections or (not path and cmd.startswith(SECTION_KEYWORDS))
+        if present:
+            if flat and not path:
+                # Only a command with children on the device opens a sub-mode
+                # worth re-entering
+                has_children = not opens_section and parent.children[cmd].children
+                previous_top, previous_sent = (cmd, False) if has_children else (None, False)
+                if opens_section:
+                    run_sent = False
+            continue
+
+        enter(path)
+        if flat and not path and previous_top is not None and not previous_sent:
+            # The previous line opens a sub-mode this command may belong to
+            delta.append(previous_top)
+        delta.append(cmd)
+
+        if flat and not path:
+            previous_top, previous_sent = (None, False) if opens_section else (cmd, True)
+            run_sent = not opens_section
+
+        # Sending a section command enters its mode on the device
+        if path + (cmd,) in sections:
+            current_path = path + (cmd,)
+
+    return delta
+
+
+class RunningConfigCache:
+    """
+    Per-device running-config cache with a TTL.
+
+    Parsed trees are kept in memory for long-lived processes such as
+    push_daemon.py. The raw config text is also written to cache_dir so that
+    separate push_config.py invocations within a workflow can reuse it.
+    With a ttl of 0 nothing is cached.
+    """
+
+    def __init__(self, ttl=DEFAULT_CACHE_TTL, cache_dir=DEFAULT_CACHE_DIR):
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def _path(self, key: tuple) -> str:
+        digest = hashlib.sha256('|'.join(key).encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f"{digest}.cfg")
+
+    def get(self, key: tuple):
+        """Return the cached tree for key, or None if missing or expired."""
+        if self.ttl <= 0:
+            return None
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and now - entry[0] <= self.ttl:
+                return entry[1]
+
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            fetched_at = os.path.getmtime(path)
+            if now - fetched_at > self.ttl:
+                return None
+            with open(path) as f:
+                tree = parse_config(f.read())
+        except OSError:
+            return None
+
+        with self.lock:
+            self.entries[key] = (fetched_at, tree)
+        return tree
+
+    def put(self, key: tuple, config_text: str) -> ConfigNode:
+        """Parse and store a freshly fetched running config."""
+        tree = parse_config(config_text)
+        if self.ttl <= 0:
+            return tree
+        with self.lock:
+            self.entries[key] = (time.time(), tree)
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, mode=0o700, exist_ok=True)
+                tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write(config_text)
+                os.replace(tmp_path, self._path(key))
+            except OSError:
+                pass
+        return tree
+
+    def invalidate(self, key: tuple):
+        """Forget a device's config after it has been changed."""
+        with self.lock:
+            self.entries.pop(key, None)
+        if self.cache_dir:
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
@@ -6,24 +6,107 @@ This script is designed to be called from XDR Workflows via SSH.
 Credentials are loaded from environment variables for security.
 
 Usage:
-    python3 push_config.py <device_ip> <device_type> <config_commands>
+    python3 push_config.py <device_ip> <device_type> <config_commands> [--defer-save] [--diff] [--stream]
+    python3 push_config.py --inventory <devices.json|devices.yml> [--workers N] [--timeout S] [--device-timeout S] [--defer-save] [--diff] [--stream]
+    python3 push_config.py --template <template> [--filter key=value] [--devices sw1,sw2] [batch options]
 
 Environment Variables Required:
     DEVICE_USERNAME - SSH username for network devices
     DEVICE_PASSWORD - SSH password for network devices
     DEVICE_ENABLE   - Enable password (optional, for IOS devices)
+    DEVICE_PORT     - SSH port (optional, default 22)
 
 Example:
     export DEVICE_USERNAME=admin
     export DEVICE_PASSWORD=cisco123
     python3 push_config.py 192.168.1.1 cisco_ios "hostname TEST,interface gi0/1,description Test"
+
+Command sets:
+    <config_commands> may also be a JSON list of lists. Each inner list is sent
+    as its own config set over the same session and the configuration is saved
+    once after the last set, instead of once per snippet:
+
+        '[["ntp server 198.18.133.141"], ["logging host 198.18.133.50"]]'
+
+Diff mode:
+    With --diff the running config is fetched once, parsed (see config_diff.py)
+    and only the commands it does not already contain are sent. If nothing is
+    missing, the push is skipped without saving. By default the running config
+    is fetched for every diff. Setting PUSH_CONFIG_CACHE_TTL caches it for that
+    many seconds in PUSH_CONFIG_CACHE_DIR (default /tmp/push_config_cache), so
+    an unchanged device is not contacted at all on repeated calls. The cache
+    entry is dropped after every change made by this script, but not after
+    changes made by anything else: only set a TTL when nothing else changes
+    the devices in the meantime, or commands may be skipped.
+
+Streaming:
+    With --stream progress is printed as newline-delimited JSON events while
+    the push runs, each with the device and the seconds elapsed since start:
+
+        {"event": "connected", "device": "10.1.1.11", "elapsed": 1.52}
+        {"event": "enable", ...}
+        {"event": "command", "command": "ntp server 198.18.133.141", "output": "...", ...}
+        {"event": "save_started", ...}
+        {"event": "save_finished", "save_time": 2.1, ...}
+        {"event": "result", "status": "success", ...}
+
+    Commands are sent one at a time so each echo is reported as it arrives,
+    and their output is not collected in the final result.
+
+Timings:
+    Every result has a "timings" dict with the seconds spent per phase
+    (connect, auth, enable, plan, send, save) and in total. Pooled pushes
+    that reuse a session have no connect/auth phase. See push_metrics.py
+    for exporting them as Prometheus metrics or OpenTelemetry spans.
+
+Batch mode:
+    The inventory is a JSON or YAML file with a list of devices, either at the
+    top level or under a "devices" key. Each entry needs "host", "device_type"
+    and "commands" (a list or a comma-separated string). A top-level "commands"
+    key is used for entries that do not define their own.
+
+        {"commands": ["ntp server 198.18.133.141"],
+         "devices": [{"host": "10.1.1.11", "device_type": "cisco_xe"},
+                     {"host": "10.1.1.12", "device_type": "cisco_xe",
+                      "commands": "hostname sw2"}]}
+
+    Devices are pushed concurrently. Each result is printed as one JSON line as
+    soon as the device finishes, followed by a final {"summary": {...}} line.
+    --timeout is the connect and read timeout of each command; --device-timeout
+    limits the wall-clock time of a whole device push (default: the sum of the
+    timeouts of its login, commands and save). A device over its limit is
+    reported as failed at once and its connection is cut; its worker is free
+    again after the read it is waiting for times out.
+
+Template mode:
+    With --template instead of --inventory, the commands of each device are
+    rendered from a Jinja2 template with variables fetched from NetBox in bulk
+    (see render_config.py) and pushed as a batch. Devices are selected with
+    --devices and/or --filter (e.g. --filter status=planned). Devices that
+    cannot be rendered are reported as failed and not pushed.
+
+Session pooling:
+    If push_daemon.py is running, pushes are sent over its Unix socket
+    (PUSH_CONFIG_SOCKET, default /tmp/push_config.sock) and reuse its open SSH
+    sessions. Without the daemon, a new session is opened per push.
+    With --defer-save the daemon skips write mem and saves after the device
+    has been idle for its --save-delay, coalescing back-to-back pushes into a
+    single save.
 """
 
+import argparse
 import os
+import socket
 import sys
 import json
-from netmiko import ConnectHandler
-from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+import threading
+import time
+# Netmiko loads every platform driver on import, which dominates the startup
+# time of this short-lived script. It is imported on first use instead, so
+# usage errors, missing credentials, daemon-served pushes and diff-skipped
+# pushes never pay for it.
+from config_diff import DEFAULT_CACHE_DIR, DEFAULT_CACHE_TTL, RunningConfigCache, compute_delta
+from push_metrics import PhaseTimer, export as export_timings, phase
 
 
 def get_credentials():
@@ -40,83 +123,719 @@ def get_credentials():
     return username, password, enable
 
 
-def push_config(device_ip: str, device_type: str, config_commands: list) -> dict:
+def check_credentials():
     """
-    Push configuration commands to a network device.
+    Fail fast on missing credentials when they will be needed.
     
-    Args:
-        device_ip: IP address or hostname of the device
-        device_type: Netmiko device type (cisco_ios, cisco_xe, cisco_nxos, etc.)
-        config_commands: List of configuration commands to send
-        
-    Returns:
-        dict with status, output, and any errors
+    A running push_daemon.py has its own credentials and does not need any
+    from the client.
     """
-    username, password, enable = get_credentials()
+    if not os.path.exists(os.environ.get('PUSH_CONFIG_SOCKET', DEFAULT_SOCKET)):
+        get_credentials()
+
+
+DEFAULT_WORKERS = 20
+DEFAULT_TIMEOUT = 30
+# Read timeout for write mem, which can take much longer than a command
+SAVE_TIMEOUT = 120
+# Seconds between deadline checks of a batch while pushes are starting
+WATCHDOG_POLL = 1.0
+DEFAULT_SOCKET = '/tmp/push_config.sock'
+
+RUNNING_CONFIG_CACHE = RunningConfigCache(
+    ttl=int(os.environ.get('PUSH_CONFIG_CACHE_TTL', DEFAULT_CACHE_TTL)),
+    cache_dir=os.environ.get('PUSH_CONFIG_CACHE_DIR', DEFAULT_CACHE_DIR),
+)
+
+
+def parse_commands(config_input) -> list:
+    """
+    Turn a JSON list string, comma-separated string or list into a command list.
+    
+    The result is either a list of command strings or a list of command sets,
+    each a list of command strings; anything else raises ValueError.
+    """
+    if isinstance(config_input, list):
+        commands = config_input
+    elif isinstance(config_input, str) and config_input.startswith(('[', '{')):
+        commands = json.loads(config_input)
+    elif isinstance(config_input, str):
+        return [cmd.strip() for cmd in config_input.split(',')]
+    else:
+        raise ValueError(f"expected a list or a string, got {type(config_input).__name__}")
+    
+    if not isinstance(commands, list):
+        raise ValueError(f"expected a JSON list, got {type(commands).__name__}")
+    if all(isinstance(cmd, str) for cmd in commands):
+        return commands
+    if all(isinstance(cmd, list) and all(isinstance(c, str) for c in cmd) for cmd in commands):
+        return commands
+    raise ValueError("expected a list of command strings or a list of lists of command strings")
+
+
+def split_command_sets(config_commands: list) -> list:
+    """Return config_commands as a list of command sets (list of lists)."""
+    if config_commands and all(isinstance(cmd, list) for cmd in config_commands):
+        return config_commands
+    return [config_commands]
+
+
+def build_device_params(device_ip: str, device_type: str, credentials: tuple,
+                        timeout: int = DEFAULT_TIMEOUT) -> dict:
+    """Build the Netmiko ConnectHandler arguments from get_credentials() output."""
+    username, password, enable = credentials
     
-    device = {
+    return {
         'device_type': device_type,
         'host': device_ip,
+        'port': int(os.environ.get('DEVICE_PORT', 22)),
         'username': username,
         'password': password,
         'secret': enable if enable else password,
-        'timeout': 30,
-        'session_timeout': 60,
+        'timeout': timeout,
+        'session_timeout': timeout * 2,
+        'read_timeout_override': timeout,
     }
-    
-    result = {
+
+
+def new_result(device_ip: str, device_type: str, config_commands: list) -> dict:
+    """Create the result dict returned for a single device push."""
+    return {
         'status': 'success',
         'device': device_ip,
         'device_type': device_type,
-        'commands_sent': len(config_commands),
+        'commands_sent': sum(len(cmds) for cmds in split_command_sets(config_commands)),
         'output': '',
         'error': None
     }
+
+
+def record_error(result: dict, error: Exception) -> dict:
+    """Mark a result as failed with a message matching the exception type."""
+    from netmiko.exceptions import NetmikoTimeoutException, NetmikoAuthenticationException
+    
+    result['status'] = 'failed'
+    if isinstance(error, NetmikoTimeoutException):
+        result['error'] = f"Connection timeout: {str(error)}"
+    elif isinstance(error, NetmikoAuthenticationException):
+        result['error'] = f"Authentication failed: {str(error)}"
+    else:
+        result['error'] = f"Unexpected error: {str(error)}"
+    return result
+
+
+def event_printer(device_ip: str, lock=None):
+    """
+    Return an on_event callback that prints progress as JSON lines.
+    
+    Args:
+        device_ip: Device reported in every event
+        lock: Optional lock shared by concurrent pushes writing to stdout
+    """
+    start = time.monotonic()
     
+    def on_event(event: str, **fields):
+        line = json.dumps({
+            'event': event,
+            'device': device_ip,
+            'elapsed': round(time.monotonic() - start, 3),
+            **fields,
+        })
+        if lock:
+            with lock:
+                print(line, flush=True)
+        else:
+            print(line, flush=True)
+    
+    return on_event
+
+
+class Watchdog:
+    """
+    Wall-clock limit for one push.
+    
+    The push registers the sockets it opens with watch(). expire() shuts them
+    down so the push cannot send anything more: its next write fails at once.
+    Netmiko does not notice a dead session while it waits for output, so the
+    thread running the push returns at its current read timeout at the latest.
+    """
+    
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.deadline = None
+        self.expired = False
+        self.sockets = []
+        self.lock = threading.Lock()
+    
+    def start(self):
+        self.deadline = time.monotonic() + self.limit
+    
+    def watch(self, sock):
+        with self.lock:
+            self.sockets.append(sock)
+            if not self.expired:
+                return
+        self._shutdown(sock)
+    
+    def expire(self):
+        with self.lock:
+            self.expired = True
+            sockets = list(self.sockets)
+        for sock in sockets:
+            self._shutdown(sock)
+    
+    @staticmethod
+    def _shutdown(sock):
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            # Already closed by the push
+            pass
+
+
+def open_connection(device: dict, timer=None, watchdog=None):
+    """
+    Open a Netmiko session, timing the TCP connect and SSH login separately.
+    
+    The TCP socket is opened here and handed to Netmiko, so "connect" covers
+    only the TCP handshake and "auth" the SSH negotiation, login and prompt
+    detection. With a watchdog the socket is cut when the push runs too long.
+    """
+    from netmiko import ConnectHandler
+    from netmiko.exceptions import NetmikoTimeoutException
+    
+    with phase(timer, 'connect'):
+        try:
+            sock = socket.create_connection((device['host'], device.get('port', 22)),
+                                            timeout=device['timeout'])
+        except OSError as e:
+            raise NetmikoTimeoutException(
+                f"TCP connection to {device['host']}:{device.get('port', 22)} failed: {e}"
+            )
+    if watchdog:
+        watchdog.watch(sock)
     try:
-        with ConnectHandler(**device) as conn:
-            if device_type in ['cisco_ios', 'cisco_xe'] and enable:
+        with phase(timer, 'auth'):
+            return ConnectHandler(**device, sock=sock)
+    except Exception:
+        sock.close()
+        raise
+
+
+def save_running_config(conn, result: dict, on_event=None) -> dict:
+    """Run write mem and record its output and duration in the result."""
+    if on_event:
+        on_event('save_started')
+    start = time.monotonic()
+    # read_timeout_override caps every read at the command timeout, and
+    # save_config() takes no read_timeout of its own
+    read_timeout_override = conn.read_timeout_override
+    conn.read_timeout_override = max(read_timeout_override or 0, SAVE_TIMEOUT)
+    try:
+        result['save_output'] = conn.save_config()
+    finally:
+        conn.read_timeout_override = read_timeout_override
+    result['save_time'] = round(time.monotonic() - start, 3)
+    result['saved'] = True
+    if on_event:
+        on_event('save_finished', save_time=result['save_time'])
+    return result
+
+
+def send_streamed(conn, command_sets: list, on_event) -> None:
+    """Send commands one at a time in config mode, reporting each echo."""
+    for commands in command_sets:
+        conn.config_mode()
+        for command in commands:
+            output = conn.send_config_set([command], enter_config_mode=False, exit_config_mode=False)
+            on_event('command', command=command, output=output)
+        conn.exit_config_mode()
+
+
+def plan_config(device_ip: str, device_type: str, config_commands: list, conn=None):
+    """
+    Reduce config_commands to the command sets missing from the running config.
+    
+    Args:
+        device_ip: IP address or hostname of the device
+        device_type: Netmiko device type
+        config_commands: List of commands, or list of command sets
+        conn: Open session used to fetch the running config on a cache miss
+        
+    Returns:
+        list of non-empty command sets (empty if nothing is missing), or None
+        if the running config is not cached and no session was given
+    """
+    key = (device_ip, device_type)
+    tree = RUNNING_CONFIG_CACHE.get(key)
+    if tree is None:
+        if conn is None:
+            return None
+        tree = RUNNING_CONFIG_CACHE.put(key, conn.send_command('show running-config'))
+    
+    command_sets = [compute_delta(tree, commands) for commands in split_command_sets(config_commands)]
+    return [commands for commands in command_sets if commands]
+
+
+def mark_skipped(result: dict) -> dict:
+    """Record that the running config already contained every command."""
+    result['commands_sent'] = 0
+    result['skipped'] = True
+    result['save_output'] = None
+    result['saved'] = False
+    return result
+
+
+def apply_config(conn, device_type: str, config_commands: list, result: dict,
+                 enable: bool = False, save: bool = True, diff: bool = False,
+                 on_event=None, timer=None) -> dict:
+    """
+    Send configuration commands over an open Netmiko session and save.
+    
+    Args:
+        conn: Connected Netmiko session (fresh or pooled)
+        device_type: Netmiko device type
+        config_commands: List of commands, or list of command sets
+        result: Result dict to fill in
+        enable: Whether an enable password is configured
+        save: Save once after all command sets; False leaves saving to the caller
+        diff: Only send commands missing from the running config
+        on_event: Optional progress callback, on_event(event, **fields);
+            commands are then sent one by one and their output is only
+            reported through the callback
+        timer: Optional PhaseTimer for the enable/plan/send/save phases
+        
+    Returns:
+        the updated result dict
+    """
+    if device_type in ['cisco_ios', 'cisco_xe'] and enable:
+        with phase(timer, 'enable'):
+            if not conn.check_enable_mode():
                 conn.enable()
+                if on_event:
+                    on_event('enable')
+    
+    if diff:
+        result['commands_requested'] = result['commands_sent']
+        with phase(timer, 'plan'):
+            config_commands = plan_config(conn.host, device_type, config_commands, conn)
+        if not config_commands:
+            return mark_skipped(result)
+        result['commands_sent'] = sum(len(commands) for commands in config_commands)
+        result['skipped'] = False
+        RUNNING_CONFIG_CACHE.invalidate((conn.host, device_type))
+        if on_event:
+            on_event('planned', commands_sent=result['commands_sent'],
+                     commands_requested=result['commands_requested'])
+    
+    start = time.monotonic()
+    with phase(timer, 'send'):
+        if on_event:
+            send_streamed(conn, split_command_sets(config_commands), on_event)
+        else:
+            outputs = [conn.send_config_set(commands) for commands in split_command_sets(config_commands)]
+            result['output'] = '\n'.join(outputs)
+    result['config_time'] = round(time.monotonic() - start, 3)
+    
+    if save:
+        with phase(timer, 'save'):
+            save_running_config(conn, result, on_event)
+    else:
+        result['save_output'] = None
+        result['save_time'] = 0.0
+        result['saved'] = False
+    
+    return result
+
+
+def push_config(device_ip: str, device_type: str, config_commands: list,
+                timeout: int = DEFAULT_TIMEOUT, diff: bool = False, on_event=None,
+                watchdog=None) -> dict:
+    """
+    Push configuration commands to a network device.
+    
+    Args:
+        device_ip: IP address or hostname of the device
+        device_type: Netmiko device type (cisco_ios, cisco_xe, cisco_nxos, etc.)
+        config_commands: List of configuration commands to send, or a list of
+            command sets that are sent in one session and saved once
+        timeout: Connection and read timeout in seconds
+        diff: Only send commands missing from the running config
+        on_event: Optional progress callback (see apply_config)
+        watchdog: Optional Watchdog that may cut the session
+        
+    Returns:
+        dict with status, output, and any errors
+    """
+    credentials = get_credentials()
+    device = build_device_params(device_ip, device_type, credentials, timeout)
+    result = new_result(device_ip, device_type, config_commands)
+    timer = PhaseTimer()
+    
+    # A cached running config that already has everything avoids the SSH session
+    if diff and plan_config(device_ip, device_type, config_commands) == []:
+        result['commands_requested'] = result['commands_sent']
+        return export_timings(timer, mark_skipped(result))
+    
+    try:
+        with open_connection(device, timer, watchdog) as conn:
+            if on_event:
+                on_event('connected')
+            apply_config(conn, device_type, config_commands, result,
+                         enable=bool(credentials[2]), diff=diff, on_event=on_event, timer=timer)
+    except Exception as e:
+        record_error(result, e)
+    
+    return export_timings(timer, result)
+
+
+def request_timeout(config_commands: list, timeout: int = DEFAULT_TIMEOUT) -> float:
+    """Longest a push of these commands may take: login, enable, every command and the save."""
+    commands = sum(len(cmds) for cmds in split_command_sets(config_commands))
+    return timeout * (commands + 2) + SAVE_TIMEOUT
+
+
+def push_via_daemon(device_ip: str, device_type: str, config_commands: list,
+                    timeout: int = DEFAULT_TIMEOUT, defer_save: bool = False,
+                    diff: bool = False, on_event=None, watchdog=None):
+    """
+    Send a push request to a running push_daemon.py.
+    
+    With on_event the daemon relays progress events as JSON lines before the
+    result line. A watchdog only cuts the wait for the reply; the daemon
+    finishes the push on its own timeouts.
+    
+    Returns:
+        the result dict, or None if no daemon is listening. Once the request
+        has been sent, a lost or broken reply is returned as a failed result
+        and must not be retried directly, since the daemon may still be
+        applying the commands.
+    """
+    socket_path = os.environ.get('PUSH_CONFIG_SOCKET', DEFAULT_SOCKET)
+    if not os.path.exists(socket_path):
+        return None
+    
+    request = {
+        'device_ip': device_ip,
+        'device_type': device_type,
+        'commands': config_commands,
+        'timeout': timeout,
+        'defer_save': defer_save,
+        'diff': diff,
+        'stream': on_event is not None,
+    }
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            # Stale socket file, no daemon listening
+            return None
+        except OSError as e:
+            result = new_result(device_ip, device_type, config_commands)
+            result.update(status='failed', error=f"Cannot reach push_daemon.py: {str(e)}")
+            return result
+        
+        sock.settimeout(request_timeout(config_commands, timeout))
+        if watchdog:
+            watchdog.watch(sock)
+        try:
+            with sock.makefile('rwb') as stream:
+                stream.write((json.dumps(request) + '\n').encode())
+                stream.flush()
+                while True:
+                    line = stream.readline()
+                    if not line:
+                        raise ValueError("connection closed without a result")
+                    reply = json.loads(line)
+                    if 'event' not in reply:
+                        return reply
+                    if on_event:
+                        on_event(reply.pop('event'), **reply)
+        except (OSError, ValueError) as e:
+            result = new_result(device_ip, device_type, config_commands)
+            result.update(
+                status='failed',
+                error=f"No result from push_daemon.py ({str(e) or type(e).__name__}); "
+                      "the push may still be applied by the daemon and was not retried",
+            )
+            return result
+
+
+def push(device_ip: str, device_type: str, config_commands: list,
+         timeout: int = DEFAULT_TIMEOUT, defer_save: bool = False,
+         diff: bool = False, on_event=None, watchdog=None) -> dict:
+    """
+    Push through the session daemon when it is running, otherwise directly.
+    
+    The direct push is only a fallback for a daemon that is not listening; a
+    request the daemon has received is never pushed a second time.
+    defer_save only has an effect with the daemon; a direct push always saves
+    before its session closes.
+    """
+    result = push_via_daemon(device_ip, device_type, config_commands, timeout, defer_save, diff,
+                             on_event, watchdog)
+    if result is None:
+        result = push_config(device_ip, device_type, config_commands, timeout, diff, on_event,
+                             watchdog)
+    return result
+
+
+def load_inventory(path: str) -> list:
+    """
+    Load a batch inventory from a JSON or YAML file.
+    
+    Args:
+        path: Path to the inventory file (.json, .yml or .yaml)
+        
+    Returns:
+        list of dicts with host, device_type and commands
+    """
+    with open(path) as f:
+        if path.endswith(('.yml', '.yaml')):
+            import yaml
+            data = yaml.safe_load(f)
+        else:
+            data = json.load(f)
+    
+    default_commands = None
+    if isinstance(data, dict):
+        default_commands = data.get('commands')
+        data = data.get('devices', [])
+    
+    devices = []
+    for entry in data:
+        commands = entry.get('commands', default_commands)
+        if not entry.get('host') or not entry.get('device_type') or commands is None:
+            raise ValueError(f"Inventory entry needs host, device_type and commands: {entry}")
+        try:
+            commands = parse_commands(commands)
+        except ValueError as e:
+            raise ValueError(f"Invalid commands for {entry['host']}: {e}") from e
+        devices.append({
+            'host': entry['host'],
+            'device_type': entry['device_type'],
+            'commands': commands,
+        })
+    return devices
+
+
+def push_config_batch(devices: list, workers: int = DEFAULT_WORKERS,
+                      timeout: int = DEFAULT_TIMEOUT, on_result=None,
+                      defer_save: bool = False, diff: bool = False,
+                      stream: bool = False, device_timeout: float = None) -> dict:
+    """
+    Push configuration to many devices concurrently.
+    
+    Args:
+        devices: List of dicts with host, device_type and commands
+        workers: Maximum number of concurrent SSH sessions
+        timeout: Per-command connection and read timeout in seconds
+        on_result: Optional callback invoked with each result as it finishes
+        defer_save: Let the session daemon coalesce saves (see push())
+        diff: Only send commands missing from each running config
+        stream: Print progress events for every device (see event_printer)
+        device_timeout: Wall-clock limit per device in seconds, counted from
+            the start of its push (default: request_timeout() of its commands)
+        
+    Returns:
+        dict with a summary of the batch
+    """
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    
+    # Fail fast on missing credentials instead of once per device
+    check_credentials()
+    
+    summary = {
+        'status': 'success',
+        'total': len(devices),
+        'succeeded': 0,
+        'failed': 0,
+        'failed_devices': [],
+        'duration': 0.0,
+    }
+    start = time.monotonic()
+    output_lock = threading.Lock()
+    
+    def _push(entry, watchdog):
+        watchdog.start()
+        device_start = time.monotonic()
+        on_event = event_printer(entry['host'], output_lock) if stream else None
+        result = push(entry['host'], entry['device_type'], entry['commands'],
+                      timeout=timeout, defer_save=defer_save, diff=diff, on_event=on_event,
+                      watchdog=watchdog)
+        result['duration'] = round(time.monotonic() - device_start, 3)
+        return result
+    
+    def _failed(entry, error):
+        result = new_result(entry['host'], entry['device_type'], entry['commands'])
+        result.update(status='failed', error=error)
+        return result
+    
+    def _report(result):
+        if result['status'] == 'success':
+            summary['succeeded'] += 1
+        else:
+            summary['failed'] += 1
+            summary['failed_devices'].append(result['device'])
+        
+        if on_result:
+            with output_lock:
+                on_result(result)
+    
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        pending = {}
+        for entry in devices:
+            watchdog = Watchdog(device_timeout or request_timeout(entry['commands'], timeout))
+            pending[executor.submit(_push, entry, watchdog)] = (entry, watchdog)
+        
+        while pending:
+            # Wake up for the next finished push or the next deadline, and
+            # regularly while pushes are still starting and have no deadline yet
+            deadlines = [watchdog.deadline for _, watchdog in pending.values() if watchdog.deadline]
+            wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            if len(deadlines) < len(pending):
+                wait_time = min(wait_time if wait_time is not None else WATCHDOG_POLL, WATCHDOG_POLL)
+            done, _ = wait(pending, timeout=wait_time, return_when=FIRST_COMPLETED)
             
-            output = conn.send_config_set(config_commands)
-            result['output'] = output
-            
-            save_output = conn.save_config()
-            result['save_output'] = save_output
+            for future in done:
+                entry, _ = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = _failed(entry, f"Unexpected error: {str(e)}")
+                _report(result)
             
-    except NetmikoTimeoutException as e:
-        result['status'] = 'failed'
-        result['error'] = f"Connection timeout: {str(e)}"
-    except NetmikoAuthenticationException as e:
-        result['status'] = 'failed'
-        result['error'] = f"Authentication failed: {str(e)}"
+            now = time.monotonic()
+            for future, (entry, watchdog) in list(pending.items()):
+                if watchdog.deadline and now >= watchdog.deadline:
+                    # The push thread returns once its sockets are cut; its result is dropped
+                    del pending[future]
+                    watchdog.expire()
+                    result = _failed(
+                        entry,
+                        f"Timed out after {watchdog.limit:g}s; "
+                        "the device may have received part of the commands",
+                    )
+                    result['duration'] = round(watchdog.limit, 3)
+                    _report(result)
+    
+    if summary['failed']:
+        summary['status'] = 'failed'
+    summary['duration'] = round(time.monotonic() - start, 3)
+    return summary
+
+
+def batch_main(argv: list):
+    from render_config import add_render_arguments, render_from_args
+    
+    parser = argparse.ArgumentParser(description="Push configuration to many devices in parallel.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--inventory', help="JSON or YAML inventory file")
+    source.add_argument('--template',
+                        help="Render the commands of NetBox devices from this Jinja2 template "
+                             "or Catalyst Center template export (see render_config.py)")
+    add_render_arguments(parser)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Maximum concurrent devices (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--timeout', type=int, default=DEFAULT_TIMEOUT,
+                        help=f"Connect and read timeout per command in seconds (default: {DEFAULT_TIMEOUT})")
+    parser.add_argument('--device-timeout', type=float,
+                        help="Wall-clock limit per device in seconds "
+                             "(default: the timeouts of its login, commands and save added up)")
+    parser.add_argument('--defer-save', action='store_true',
+                        help="Let push_daemon.py coalesce write mem across pushes")
+    parser.add_argument('--diff', action='store_true',
+                        help="Only send commands missing from the running config")
+    parser.add_argument('--stream', action='store_true',
+                        help="Print per-device progress events as JSON lines")
+    args = parser.parse_args(argv)
+    
+    render_errors = {}
+    try:
+        if args.template:
+            # Check the credentials before querying NetBox and rendering
+            check_credentials()
+            devices, render_errors = render_from_args(args.template, args)
+        else:
+            devices = load_inventory(args.inventory)
+        for name, error in sorted(render_errors.items()):
+            print(json.dumps({'status': 'failed', 'device': name, 'error': error}), flush=True)
+        summary = push_config_batch(
+            devices,
+            workers=args.workers,
+            timeout=args.timeout,
+            device_timeout=args.device_timeout,
+            on_result=lambda result: print(json.dumps(result), flush=True),
+            defer_save=args.defer_save,
+            diff=args.diff,
+            stream=args.stream,
+        )
     except Exception as e:
-        result['status'] = 'failed'
-        result['error'] = f"Unexpected error: {str(e)}"
+        print(json.dumps({'status': 'failed', 'error': str(e)}))
+        sys.exit(1)
     
-    return result
+    # Devices that could not be rendered count as failed pushes
+    if render_errors:
+        summary['status'] = 'failed'
+        summary['total'] += len(render_errors)
+        summary['failed'] += len(render_errors)
+        summary['failed_devices'].extend(sorted(render_errors))
+    
+    print(json.dumps({'summary': summary}), flush=True)
+    
+    if summary['status'] == 'failed':
+        sys.exit(1)
+    sys.exit(0)
+
+
+def exit_with_error(error: str):
+    print(json.dumps({'status': 'failed', 'error': error}))
+    sys.exit(1)
 
 
 def main():
+    if len(sys.argv) > 1 and sys.argv[1].startswith('--'):
+        batch_main(sys.argv[1:])
+    
+    # Validate everything that does not need a device before connecting
+    usage = 'Usage: push_config.py <device_ip> <device_type> <config_commands> [--defer-save] [--diff] [--stream]'
     if len(sys.argv) < 4:
-        print(json.dumps({
-            'status': 'failed',
-            'error': 'Usage: push_config.py <device_ip> <device_type> <config_commands>'
-        }))
-        sys.exit(1)
+        exit_with_error(usage)
     
     device_ip = sys.argv[1]
     device_type = sys.argv[2]
     config_input = sys.argv[3]
     
-    if config_input.startswith('['):
-        config_commands = json.loads(config_input)
-    else:
-        config_commands = [cmd.strip() for cmd in config_input.split(',')]
+    options = sys.argv[4:]
+    unknown = [option for option in options if option not in ('--defer-save', '--diff', '--stream')]
+    if unknown or not device_ip or not device_type:
+        exit_with_error(usage)
+    defer_save = '--defer-save' in options
+    diff = '--diff' in options
+    stream = '--stream' in options
     
-    result = push_config(device_ip, device_type, config_commands)
+    try:
+        config_commands = parse_commands(config_input)
+    except ValueError as e:
+        exit_with_error(f"Invalid config_commands: {str(e)}")
+    if not any(split_command_sets(config_commands)):
+        exit_with_error("No configuration commands given")
     
-    print(json.dumps(result, indent=2))
+    try:
+        check_credentials()
+    except ValueError as e:
+        exit_with_error(str(e))
+    
+    on_event = event_printer(device_ip) if stream else None
+    
+    result = push(device_ip, device_type, config_commands, defer_save=defer_save, diff=diff,
+                  on_event=on_event)
+    
+    if stream:
+        on_event('result', **result)
+    else:
+        print(json.dumps(result, indent=2))
     
     if result['status'] == 'failed':
         sys.exit(1)
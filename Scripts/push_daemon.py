@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Long-lived worker that keeps authenticated Netmiko sessions open for push_config.py.
+
+Opening an SSH session, detecting the prompt and entering enable mode takes
+longer than pushing a small config snippet. This daemon keeps an LRU pool of
+sessions keyed by (host, device_type, username) and serves push requests over
+a Unix socket, so repeated pushes to the same device reuse one session.
+
+Usage:
+    python3 push_daemon.py [--socket PATH] [--max-sessions N] [--idle-timeout S] [--save-delay S]
+
+Credentials are read from the same environment variables as push_config.py.
+While the daemon is running, push_config.py sends its requests to the socket
+and falls back to a direct connection if the daemon is not reachable.
+
+Protocol:
+    One JSON request per connection, terminated by a newline:
+        {"device_ip": "10.1.1.11", "device_type": "cisco_xe",
+         "commands": ["ntp server 198.18.133.141"], "timeout": 30,
+         "defer_save": false, "diff": false, "stream": false}
+    The reply is the push_config() result dict as one JSON line. With
+    "stream": true it is preceded by progress events, one JSON line each,
+    with an "event" key (see push_config.py --stream).
+
+Deferred saves:
+    With "defer_save": true the push returns without write mem. The save runs
+    once the device has received no further pushes for --save-delay seconds,
+    and before its session is evicted or the daemon shuts down.
+"""
+
+import argparse
+import json
+import logging
+import os
+import socketserver
+import threading
+import time
+from collections import OrderedDict
+
+from push_config import (
+    DEFAULT_SOCKET,
+    DEFAULT_TIMEOUT,
+    apply_config,
+    build_device_params,
+    get_credentials,
+    mark_skipped,
+    new_result,
+    open_connection,
+    parse_commands,
+    plan_config,
+    record_error,
+    save_running_config,
+)
+from push_metrics import PhaseTimer, export as export_timings
+
+DEFAULT_MAX_SESSIONS = 50
+DEFAULT_IDLE_TIMEOUT = 300
+DEFAULT_SAVE_DELAY = 10
+
+
+class PooledSession:
+    """A Netmiko session with a lock, last-used timestamp and pending save state."""
+
+    def __init__(self, conn, device=None):
+        self.conn = conn
+        # Connection parameters, to redo a save on a new session if this one dies
+        self.device = device
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.save_pending = False
+        self.save_timer = None
+
+    def flush_save(self):
+        """Run a deferred write mem if one is pending. Call with self.lock held."""
+        if self.save_timer:
+            self.save_timer.cancel()
+            self.save_timer = None
+        if not self.save_pending:
+            return None
+        result = save_running_config(self.conn, {})
+        self.save_pending = False
+        logging.info(f"Deferred save on {self.conn.host} took {result['save_time']}s")
+        return result
+
+    def close(self):
+        try:
+            self.flush_save()
+        except Exception as e:
+            logging.error(f"Deferred save on {self.conn.host} failed: {e}")
+        try:
+            self.conn.disconnect()
+        except Exception as e:
+            logging.warning(f"Error while closing session to {self.conn.host}: {e}")
+
+
+class SessionPool:
+    """
+    LRU pool of authenticated Netmiko sessions.
+
+    Sessions are health-checked with is_alive() before reuse, evicted when idle
+    for longer than idle_timeout and, when the pool is full, the least recently
+    used idle session is closed to make room.
+    """
+
+    def __init__(self, max_sessions=DEFAULT_MAX_SESSIONS, idle_timeout=DEFAULT_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def acquire(self, device: dict, timer=None) -> PooledSession:
+        """
+        Return a locked session for the device, connecting if needed.
+
+        The caller must release session.lock when done. A new connection is
+        timed on timer (see push_config.open_connection).
+        """
+        key = (device['host'], device['device_type'], device['username'])
+
+        with self.lock:
+            session = self.sessions.get(key)
+            if session:
+                self.sessions.move_to_end(key)
+
+        if session:
+            session.lock.acquire()
+            if self._is_healthy(session):
+                return session
+            logging.info(f"Pooled session to {key[0]} is stale, reconnecting")
+            session.close()
+            # A deferred save that failed on the dead session moves to the new one
+            save_pending = session.save_pending
+            session.lock.release()
+            with self.lock:
+                if self.sessions.get(key) is session:
+                    del self.sessions[key]
+        else:
+            save_pending = False
+
+        session = PooledSession(open_connection(device, timer), device)
+        session.save_pending = save_pending
+        session.lock.acquire()
+        with self.lock:
+            old = self.sessions.pop(key, None)
+            self.sessions[key] = session
+            evicted = self._enforce_limit()
+        # Closing may run a deferred write mem, so it happens outside the pool lock
+        for evicted_session in evicted:
+            evicted_session.close()
+            evicted_session.lock.release()
+        if old:
+            self._close_when_idle(old)
+        return session
+
+    def discard(self, session: PooledSession):
+        """Drop a session after an error so the next request reconnects."""
+        with session.lock:
+            self.discard_locked(session)
+
+    def discard_locked(self, session: PooledSession):
+        """Like discard(), for callers already holding session.lock."""
+        with self.lock:
+            for key, pooled in list(self.sessions.items()):
+                if pooled is session:
+                    del self.sessions[key]
+        session.close()
+
+    def evict_idle(self):
+        """Close sessions that have not been used within idle_timeout."""
+        now = time.monotonic()
+        with self.lock:
+            expired = [
+                key for key, session in self.sessions.items()
+                if now - session.last_used > self.idle_timeout and not session.lock.locked()
+            ]
+            evicted = [self.sessions.pop(key) for key in expired]
+        for session in evicted:
+            logging.info(f"Evicting idle session to {session.conn.host}")
+            self._close_when_idle(session)
+
+    def close_all(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
+
+    def _enforce_limit(self) -> list:
+        # Called with self.lock held; only sessions not in use are evicted.
+        # Returns the evicted sessions with their locks held, for the caller
+        # to close and release after dropping self.lock.
+        evicted = []
+        for key in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                break
+            session = self.sessions[key]
+            if session.lock.acquire(blocking=False):
+                del self.sessions[key]
+                evicted.append(session)
+        return evicted
+
+    def _close_when_idle(self, session: PooledSession):
+        with session.lock:
+            session.close()
+
+    @staticmethod
+    def _is_healthy(session: PooledSession) -> bool:
+        try:
+            return session.conn.is_alive()
+        except Exception:
+            return False
+
+
+class PushHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = {}
+        try:
+            request = json.loads(self.rfile.readline())
+            if not isinstance(request, dict):
+                raise ValueError("expected a JSON object")
+            device_ip = request['device_ip']
+            device_type = request['device_type']
+            commands = parse_commands(request['commands'])
+            on_event = self.send_event if request.get('stream') else None
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            # Keep the result shape, batch clients report every result by device
+            fields = request if isinstance(request, dict) else {}
+            result = new_result(fields.get('device_ip'), fields.get('device_type'), [])
+            result.update(status='failed', error=f"Invalid request: {str(e)}")
+        else:
+            try:
+                result = self.server.push(
+                    device_ip,
+                    device_type,
+                    commands,
+                    request.get('timeout', DEFAULT_TIMEOUT),
+                    request.get('defer_save', False),
+                    request.get('diff', False),
+                    on_event,
+                )
+            except Exception as e:
+                result = record_error(new_result(device_ip, device_type, commands), e)
+        try:
+            self.wfile.write((json.dumps(result) + '\n').encode())
+        except OSError as e:
+            logging.warning(f"Could not return the result for {result.get('device')}: {e}")
+
+    def send_event(self, event: str, **fields):
+        # A client that went away must not abort the push itself
+        try:
+            self.wfile.write((json.dumps({'event': event, **fields}) + '\n').encode())
+            self.wfile.flush()
+        except OSError:
+            pass
+
+
+class PushDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, pool: SessionPool, save_delay=DEFAULT_SAVE_DELAY):
+        self.pool = pool
+        self.save_delay = save_delay
+        self.credentials = get_credentials()
+        super().__init__(socket_path, PushHandler)
+        os.chmod(socket_path, 0o600)
+
+    def push(self, device_ip: str, device_type: str, config_commands: list,
+             timeout: int = DEFAULT_TIMEOUT, defer_save: bool = False,
+             diff: bool = False, on_event=None) -> dict:
+        """Same contract as push_config.push_config(), using a pooled session."""
+        device = build_device_params(device_ip, device_type, self.credentials, timeout)
+        result = new_result(device_ip, device_type, config_commands)
+        result['pooled'] = True
+        timer = PhaseTimer()
+
+        if diff and plan_config(device_ip, device_type, config_commands) == []:
+            result['commands_requested'] = result['commands_sent']
+            return export_timings(timer, mark_skipped(result))
+
+        try:
+            session = self.pool.acquire(device, timer)
+        except Exception as e:
+            return export_timings(timer, record_error(result, e))
+        # A save carried over from a stale session needs its own timer
+        if session.save_pending and not session.save_timer:
+            self._schedule_save(session)
+
+        try:
+            if on_event:
+                on_event('connected', pooled=True)
+            apply_config(session.conn, device_type, config_commands, result,
+                         enable=bool(self.credentials[2]), save=not defer_save, diff=diff,
+                         on_event=on_event, timer=timer)
+            # A skipped push changed nothing, so any pending save stays as it was
+            if defer_save and not result.get('skipped'):
+                session.save_pending = True
+                self._schedule_save(session)
+                result['save_deferred'] = True
+            elif not result.get('skipped'):
+                session.save_pending = False
+        except Exception as e:
+            record_error(result, e)
+            session.lock.release()
+            self.pool.discard(session)
+            if session.save_pending:
+                self._retry_save_later(session.device)
+            return export_timings(timer, result)
+
+        session.last_used = time.monotonic()
+        session.lock.release()
+        return export_timings(timer, result)
+
+    def _schedule_save(self, session: PooledSession):
+        # Called with session.lock held; each push restarts the debounce window
+        if session.save_timer:
+            session.save_timer.cancel()
+        session.save_timer = threading.Timer(self.save_delay, self._deferred_save, args=(session,))
+        session.save_timer.daemon = True
+        session.save_timer.start()
+
+    def _deferred_save(self, session: PooledSession):
+        with session.lock:
+            session.save_timer = None
+            try:
+                session.flush_save()
+                return
+            except Exception as e:
+                logging.error(f"Deferred save on {session.conn.host} failed: {e}")
+                self.pool.discard_locked(session)
+        self._retry_save(session.device)
+
+    def _retry_save_later(self, device: dict):
+        timer = threading.Timer(self.save_delay, self._retry_save, args=(device,))
+        timer.daemon = True
+        timer.start()
+
+    def _retry_save(self, device: dict):
+        """Run a deferred save that was lost with its session on a new session, once."""
+        logging.info(f"Retrying the deferred save on {device['host']} on a new session")
+        try:
+            session = self.pool.acquire(device)
+        except Exception as e:
+            logging.error(f"Deferred save on {device['host']} lost, cannot reconnect: {e}")
+            return
+        try:
+            session.save_pending = True
+            session.flush_save()
+        except Exception as e:
+            logging.error(f"Deferred save on {device['host']} lost, retry failed: {e}")
+            session.save_pending = False
+            self.pool.discard_locked(session)
+        finally:
+            session.lock.release()
+
+
+def _evict_loop(pool: SessionPool, interval: float):
+    while True:
+        time.sleep(interval)
+        pool.evict_idle()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Pooled SSH session daemon for push_config.py.")
+    parser.add_argument('--socket', default=os.environ.get('PUSH_CONFIG_SOCKET', DEFAULT_SOCKET),
+                        help=f"Unix socket path (default: {DEFAULT_SOCKET})")
+    parser.add_argument('--max-sessions', type=int, default=DEFAULT_MAX_SESSIONS,
+                        help=f"Maximum pooled sessions (default: {DEFAULT_MAX_SESSIONS})")
+    parser.add_argument('--idle-timeout', type=int, default=DEFAULT_IDLE_TIMEOUT,
+                        help=f"Close sessions idle for this many seconds (default: {DEFAULT_IDLE_TIMEOUT})")
+    parser.add_argument('--save-delay', type=int, default=DEFAULT_SAVE_DELAY,
+                        help=f"Seconds without pushes before a deferred save runs (default: {DEFAULT_SAVE_DELAY})")
+    args = parser.parse_args()
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+
+    pool = SessionPool(max_sessions=args.max_sessions, idle_timeout=args.idle_timeout)
+    server = PushDaemon(args.socket, pool, save_delay=args.save_delay)
+
+    threading.Thread(
+        target=_evict_loop, args=(pool, max(1, args.idle_timeout / 4)), daemon=True
+    ).start()
+
+    logging.info(f"push_daemon listening on {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close_all()
+        os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
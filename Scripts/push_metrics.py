@@ -0,0 +1,211 @@
+"""
+Per-phase latency measurement for push_config.py and push_daemon.py.
+
+PhaseTimer records a monotonic-clock duration for each phase of a push
+(connect, auth, enable, plan, send, save). The totals end up in the result
+dict under "timings" and can optionally be exported:
+
+    PUSH_CONFIG_METRICS_FILE  Prometheus textfile (for the node_exporter
+                              textfile collector) with a latency histogram
+                              per device_type and phase
+    PUSH_CONFIG_OTEL          Set to 1 to emit OpenTelemetry spans, one per
+                              push with a child span per phase
+
+Spans need an OpenTelemetry SDK. When the script runs under
+opentelemetry-instrument, the tracer provider configured there is used.
+Otherwise, if OTEL_EXPORTER_OTLP_ENDPOINT is set, an SDK tracer provider with
+an OTLP exporter is set up (opentelemetry-sdk and opentelemetry-exporter-otlp
+must be installed; OTEL_EXPORTER_OTLP_PROTOCOL selects grpc or http/protobuf,
+OTEL_SERVICE_NAME defaults to push_config). Without either, no spans are sent.
+
+Exporting never fails a push; problems are reported on stderr.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+METRICS_FILE = os.environ.get('PUSH_CONFIG_METRICS_FILE')
+OTEL_ENABLED = os.environ.get('PUSH_CONFIG_OTEL', '').lower() in ('1', 'true', 'yes')
+
+# Set once the missing OpenTelemetry setup has been reported
+_otel_warned = False
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+class PhaseTimer:
+    """Record the duration of named phases relative to a common start."""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.start_ns = time.time_ns()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        begin = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases.append((name, begin - self.start, time.monotonic() - begin))
+
+    def as_dict(self) -> dict:
+        """Seconds per phase, plus the total time since the timer was created."""
+        timings = {}
+        for name, _, duration in self.phases:
+            timings[name] = round(timings.get(name, 0.0) + duration, 3)
+        timings['total'] = round(time.monotonic() - self.start, 3)
+        return timings
+
+
+def phase(timer, name: str):
+    """timer.phase(name), or a no-op context if timer is None."""
+    return timer.phase(name) if timer else nullcontext()
+
+
+def _labels(**labels) -> str:
+    return ','.join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def _render(state: dict) -> str:
+    lines = [
+        '# HELP push_config_phase_seconds Time spent in each phase of a configuration push.',
+        '# TYPE push_config_phase_seconds histogram',
+    ]
+    for key, histogram in sorted(state['phases'].items()):
+        device_type, name = key.split('|')
+        for bound, count in zip(BUCKETS, histogram['buckets']):
+            labels = _labels(device_type=device_type, phase=name, le=bound)
+            lines.append(f'push_config_phase_seconds_bucket{{{labels}}} {count}')
+        labels = _labels(device_type=device_type, phase=name)
+        lines.append(f'push_config_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+        lines.append(f'push_config_phase_seconds_sum{{{labels}}} {histogram["sum"]:.3f}')
+        lines.append(f'push_config_phase_seconds_count{{{labels}}} {histogram["count"]}')
+
+    lines += [
+        '# HELP push_config_pushes_total Configuration pushes by device type and status.',
+        '# TYPE push_config_pushes_total counter',
+    ]
+    for key, count in sorted(state['pushes'].items()):
+        device_type, status = key.split('|')
+        lines.append(f'push_config_pushes_total{{{_labels(device_type=device_type, status=status)}}} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path: str, device_type: str, status: str, timings: dict):
+    """
+    Add one push to the histograms in a Prometheus textfile.
+
+    Every push_config.py run is a separate process, so the cumulative
+    counters are kept in a JSON state file next to the textfile and updated
+    under an exclusive lock.
+    """
+    import fcntl
+
+    with open(f'{path}.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(f'{path}.state.json') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = {'phases': {}, 'pushes': {}}
+
+        for name, seconds in timings.items():
+            histogram = state['phases'].setdefault(
+                f'{device_type}|{name}', {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+            )
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram['buckets'][i] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+        push_key = f'{device_type}|{status}'
+        state['pushes'][push_key] = state['pushes'].get(push_key, 0) + 1
+
+        for target, content in ((f'{path}.state.json', json.dumps(state)), (path, _render(state))):
+            tmp_path = f'{target}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, target)
+
+
+def _setup_tracer_provider(trace):
+    """
+    Install an SDK tracer provider with an OTLP exporter.
+
+    Without a configured provider the API hands out no-op spans. Nothing is
+    changed when opentelemetry-instrument (or the application) already set a
+    provider, or when no OTLP endpoint is configured.
+    """
+    if not isinstance(trace.get_tracer_provider(), trace.ProxyTracerProvider):
+        return
+    if not os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT'):
+        global _otel_warned
+        if _otel_warned:
+            return
+        _otel_warned = True
+        print("push_metrics: PUSH_CONFIG_OTEL is set but neither opentelemetry-instrument "
+              "nor OTEL_EXPORTER_OTLP_ENDPOINT is configured; no spans are sent", file=sys.stderr)
+        return
+
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    if os.environ.get('OTEL_EXPORTER_OTLP_PROTOCOL', 'grpc').startswith('http'):
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    else:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+
+    resource = Resource.create({'service.name': os.environ.get('OTEL_SERVICE_NAME', 'push_config')})
+    provider = TracerProvider(resource=resource)
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+
+
+def export_spans(timer: PhaseTimer, result: dict):
+    """Emit the push and its phases as OpenTelemetry spans."""
+    from opentelemetry import trace
+
+    _setup_tracer_provider(trace)
+    tracer = trace.get_tracer('push_config')
+    end_ns = timer.start_ns + int((time.monotonic() - timer.start) * 1e9)
+    root = tracer.start_span(
+        'push_config',
+        start_time=timer.start_ns,
+        attributes={
+            'device': result.get('device', ''),
+            'device_type': result.get('device_type', ''),
+            'status': result.get('status', ''),
+            'pooled': bool(result.get('pooled', False)),
+        },
+    )
+    context = trace.set_span_in_context(root)
+    for name, offset, duration in timer.phases:
+        start_ns = timer.start_ns + int(offset * 1e9)
+        span = tracer.start_span(name, context=context, start_time=start_ns)
+        span.end(end_time=start_ns + int(duration * 1e9))
+    root.end(end_time=end_ns)
+
+    # push_config.py exits right after the push; flush batching processors
+    provider = trace.get_tracer_provider()
+    if hasattr(provider, 'force_flush'):
+        provider.force_flush()
+
+
+def export(timer: PhaseTimer, result: dict):
+    """Store the timings in the result and send them to the configured exporters."""
+    result['timings'] = timer.as_dict()
+    try:
+        if METRICS_FILE:
+            write_textfile(METRICS_FILE, result.get('device_type', ''), result.get('status', ''),
+                           result['timings'])
+        if OTEL_ENABLED:
+            export_spans(timer, result)
+    except Exception as e:
+        print(f"push_metrics: export failed: {e}", file=sys.stderr)
+    return result
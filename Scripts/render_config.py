@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Render per-device configuration from a Jinja2 template and NetBox data.
+
+The variables of all target devices are fetched from NetBox in bulk (one
+device query, one uplink interface query and one VLAN query, paginated and
+chunked, however many devices there are), the template is compiled once, and
+the rendered command lists are returned in the inventory format of
+push_config.py, so they can be pushed with push_config_batch() directly:
+
+    python3 push_config.py --template ../Ansible/templates/Ansible_Day0-Template.json \\
+        --filter status=planned [--workers N] [--diff]
+
+Usage:
+    python3 render_config.py <template> [--template-name NAME] [--devices sw1,sw2] \\
+        [--filter key=value ...] [--device-type cisco_xe] [--output devices.json]
+
+Templates:
+    Either a Jinja2 file or a Catalyst Center template export (a JSON list of
+    templates with "templateContent", like Ansible_Day0-Template.json). The
+    "||" and "&&" operators of the Catalyst Center Jinja dialect are
+    translated to "or" and "and", and the defaults of its templateParams are
+    used for variables NetBox does not provide (SystemMTU, Portchannel).
+
+Variables:
+    The same as 02_switch-onboarding.yml passes to Catalyst Center:
+
+        Hostname    device name
+        SwitchIP    primary IPv4 address
+        SubnetMask  netmask of the primary IPv4 address
+        Gateway     first host address of the primary IPv4 prefix
+        MgmtVlan    VID of the VLAN named MGMT
+        Interfaces  first interface of the device labelled "Uplink"
+
+Compiled templates are cached in memory and, as Jinja2 bytecode, in
+RENDER_TEMPLATE_CACHE_DIR (default /tmp/push_config_cache/templates, empty
+to disable), so repeated runs with the same template skip compilation.
+
+Environment Variables Required:
+    NETBOX_API      - NetBox URL
+    NETBOX_TOKEN    - NetBox API token
+"""
+
+import argparse
+import hashlib
+import ipaddress
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+from config_diff import DEFAULT_CACHE_DIR
+
+DEFAULT_DEVICE_TYPE = 'cisco_xe'
+DEFAULT_MGMT_VLAN = 'MGMT'
+UPLINK_LABEL = 'Uplink'
+
+# Names or ids per NetBox filter request, keeps the query URL short
+NETBOX_CHUNK_SIZE = 100
+# Objects per NetBox page
+NETBOX_PAGE_SIZE = 1000
+
+TEMPLATE_CACHE_DIR = os.environ.get('RENDER_TEMPLATE_CACHE_DIR', os.path.join(DEFAULT_CACHE_DIR, 'templates'))
+
+# Catalyst Center accepts these operators in Jinja expressions
+DIALECT_OPERATORS = {'||': 'or', '&&': 'and'}
+_TAG_RE = re.compile(r'({%.*?%}|{{.*?}})', re.DOTALL)
+
+# Sources of the compiled templates, by SHA-256 of the source
+_SOURCES = {}
+
+
+def translate_dialect(source: str) -> str:
+    """Replace Catalyst Center operators inside Jinja tags with their Jinja2 equivalents."""
+    def _translate(match):
+        tag = match.group(0)
+        for operator, replacement in DIALECT_OPERATORS.items():
+            tag = tag.replace(operator, f' {replacement} ')
+        return tag
+
+    return _TAG_RE.sub(_translate, source)
+
+
+def _param_default(param: dict):
+    value = param.get('defaultValue')
+    if value in (None, ''):
+        return None
+    if param.get('dataType') == 'INTEGER':
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    return value
+
+
+def load_template(path: str, name: str = None) -> tuple:
+    """
+    Load a Jinja2 template file or a Catalyst Center template export.
+
+    Args:
+        path: Path to the template (.json for a Catalyst Center export)
+        name: Template to use from an export with several templates
+
+    Returns:
+        tuple of (source, defaults): the Jinja2 source and a dict of default
+        variable values from the template parameters
+    """
+    with open(path) as f:
+        if not path.endswith('.json'):
+            return f.read(), {}
+        templates = json.load(f)
+
+    if isinstance(templates, dict):
+        templates = [templates]
+    matches = [t for t in templates if name is None or t.get('name') == name]
+    if not matches:
+        raise ValueError(f"Template {name!r} not found in {path}")
+    template = matches[0]
+
+    defaults = {
+        param['parameterName']: _param_default(param)
+        for param in template.get('templateParams', [])
+        if _param_default(param) is not None
+    }
+    return translate_dialect(template['templateContent']), defaults
+
+
+@lru_cache(maxsize=1)
+def _environment():
+    from jinja2 import Environment, FileSystemBytecodeCache, FunctionLoader, StrictUndefined
+
+    bytecode_cache = None
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, mode=0o700, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    return Environment(
+        loader=FunctionLoader(lambda digest: (_SOURCES[digest], None, lambda: True)),
+        bytecode_cache=bytecode_cache,
+        undefined=StrictUndefined,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False,
+    )
+
+
+def compile_template(source: str):
+    """Return the compiled Jinja2 template for a source, compiling it at most once."""
+    digest = hashlib.sha256(source.encode()).hexdigest()
+    _SOURCES[digest] = source
+    return _environment().get_template(digest)
+
+
+def to_commands(rendered: str) -> list:
+    """
+    Turn rendered configuration into a command list.
+
+    Indentation is kept, so config_diff reads the sections from it instead of
+    guessing them from keywords; the device ignores it. "!" is kept as a
+    section end, comments ("!text") and blank lines are dropped.
+    """
+    commands = []
+    for line in rendered.splitlines():
+        command = line.strip()
+        if command and (command == '!' or not command.startswith('!')):
+            commands.append(line.rstrip())
+    return commands
+
+
+def _chunks(items: list, size: int = NETBOX_CHUNK_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def fetch_device_variables(netbox_url: str, netbox_token: str, names: list = None,
+                           filters: dict = None, mgmt_vlan: str = DEFAULT_MGMT_VLAN) -> tuple:
+    """
+    Fetch the template variables of all target devices from NetBox in bulk.
+
+    Args:
+        netbox_url: NetBox URL
+        netbox_token: NetBox API token
+        names: Device names to render, all devices matching filters if None
+        filters: NetBox device filters, e.g. {'status': 'planned'}
+        mgmt_vlan: Name of the management VLAN
+
+    Returns:
+        tuple of (variables, errors): dicts of device name to its variables,
+        and to the reason it cannot be rendered
+    """
+    import pynetbox
+
+    nb = pynetbox.api(url=netbox_url, token=netbox_token)
+    nb.http_session.verify = False  # Disable SSL verification for self-signed certs
+    filters = dict(filters or {})
+
+    if names:
+        devices = [
+            device
+            for chunk in _chunks(sorted(set(names)))
+            for device in nb.dcim.devices.filter(name=chunk, limit=NETBOX_PAGE_SIZE, **filters)
+        ]
+    else:
+        devices = list(nb.dcim.devices.filter(limit=NETBOX_PAGE_SIZE, **filters))
+
+    vlans = list(nb.ipam.vlans.filter(name=mgmt_vlan, limit=NETBOX_PAGE_SIZE))
+
+    uplinks = {}
+    for chunk in _chunks([device.id for device in devices]):
+        for interface in nb.dcim.interfaces.filter(device_id=chunk, label=UPLINK_LABEL, limit=NETBOX_PAGE_SIZE):
+            uplinks.setdefault(interface.device.id, []).append(interface.name)
+
+    variables, errors = {}, {}
+    found = {device.name for device in devices}
+    for name in names or []:
+        if name not in found:
+            errors[name] = "Device not found in NetBox"
+
+    for device in devices:
+        if not vlans:
+            errors[device.name] = f"VLAN {mgmt_vlan} not found in NetBox"
+        elif not device.primary_ip4:
+            errors[device.name] = "Device has no primary IPv4 address"
+        elif device.id not in uplinks:
+            errors[device.name] = f"Device has no interface labelled {UPLINK_LABEL}"
+        else:
+            interface = ipaddress.ip_interface(device.primary_ip4.address)
+            variables[device.name] = {
+                'Hostname': device.name,
+                'SwitchIP': str(interface.ip),
+                'SubnetMask': str(interface.netmask),
+                'Gateway': str(interface.network.network_address + 1),
+                'MgmtVlan': vlans[0].vid,
+                'Interfaces': sorted(uplinks[device.id])[0],
+            }
+    return variables, errors
+
+
+def render_devices(source: str, variables: dict, defaults: dict = None,
+                   device_type: str = DEFAULT_DEVICE_TYPE) -> tuple:
+    """
+    Render the template for every device.
+
+    Args:
+        source: Jinja2 template source
+        variables: dict of device name to its variables
+        defaults: Variables used where a device does not define its own
+        device_type: Netmiko device type of all devices
+
+    Returns:
+        tuple of (devices, errors): push_config inventory entries with host,
+        device_type, commands and name, and a dict of device name to the
+        reason its template failed to render
+    """
+    template = compile_template(source)
+    devices, errors = [], {}
+    for name, device_variables in variables.items():
+        try:
+            rendered = template.render({**(defaults or {}), **device_variables})
+        except Exception as e:
+            errors[name] = f"Template rendering failed: {str(e)}"
+            continue
+        devices.append({
+            'host': device_variables['SwitchIP'],
+            'device_type': device_type,
+            'commands': to_commands(rendered),
+            'name': name,
+        })
+    return devices, errors
+
+
+def render_inventory(template_path: str, template_name: str = None, names: list = None,
+                     filters: dict = None, device_type: str = DEFAULT_DEVICE_TYPE,
+                     netbox_url: str = None, netbox_token: str = None) -> tuple:
+    """
+    Load a template, fetch the device variables from NetBox and render all devices.
+
+    NETBOX_API and NETBOX_TOKEN are used unless netbox_url and netbox_token
+    are given.
+
+    Returns:
+        tuple of (devices, errors) as returned by render_devices()
+    """
+    netbox_url = netbox_url or os.environ.get('NETBOX_API')
+    netbox_token = netbox_token or os.environ.get('NETBOX_TOKEN')
+    if not netbox_url or not netbox_token:
+        raise ValueError("Missing NetBox settings. Set NETBOX_API and NETBOX_TOKEN environment variables.")
+
+    source, defaults = load_template(template_path, template_name)
+    variables, errors = fetch_device_variables(netbox_url, netbox_token, names, filters)
+    devices, render_errors = render_devices(source, variables, defaults, device_type)
+    errors.update(render_errors)
+    return devices, errors
+
+
+def parse_filters(pairs: list) -> dict:
+    """Turn ["status=planned", "site=ch-zh"] into a filter dict."""
+    filters = {}
+    for pair in pairs or []:
+        key, sep, value = pair.partition('=')
+        if not sep or not key:
+            raise ValueError(f"Invalid filter {pair!r}, expected key=value")
+        filters.setdefault(key, []).append(value)
+    return {key: values[0] if len(values) == 1 else values for key, values in filters.items()}
+
+
+def add_render_arguments(parser: argparse.ArgumentParser):
+    """Add the device selection options shared with push_config.py --template."""
+    parser.add_argument('--template-name', help="Template to use from a Catalyst Center export")
+    parser.add_argument('--devices', help="Comma-separated device names (default: all matching --filter)")
+    parser.add_argument('--filter', action='append', default=[], metavar='KEY=VALUE',
+                        help="NetBox device filter, repeatable (e.g. status=planned)")
+    parser.add_argument('--device-type', default=DEFAULT_DEVICE_TYPE,
+                        help=f"Netmiko device type (default: {DEFAULT_DEVICE_TYPE})")
+
+
+def render_from_args(template_path: str, args: argparse.Namespace) -> tuple:
+    """render_inventory() with the options added by add_render_arguments()."""
+    names = [name.strip() for name in args.devices.split(',') if name.strip()] if args.devices else None
+    return render_inventory(template_path, args.template_name, names, parse_filters(args.filter),
+                            args.device_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render device configuration from a Jinja2 template and NetBox.")
+    parser.add_argument('template', help="Jinja2 template or Catalyst Center template export (.json)")
+    add_render_arguments(parser)
+    parser.add_argument('--output', help="Write the push_config.py inventory to this file (default: stdout)")
+    args = parser.parse_args()
+
+    try:
+        devices, errors = render_from_args(args.template, args)
+    except Exception as e:
+        print(json.dumps({'status': 'failed', 'error': str(e)}))
+        sys.exit(1)
+
+    inventory = json.dumps({'devices': devices}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(inventory)
+    else:
+        print(inventory)
+
+    for name, error in sorted(errors.items()):
+        print(json.dumps({'status': 'failed', 'device': name, 'error': error}), file=sys.stderr)
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
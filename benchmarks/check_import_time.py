@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Startup-time regression check for Scripts/push_config.py.
+
+XDR starts push_config.py as a new process for every push, so its import
+time is paid on every call. This check imports the module with
+`python -X importtime` in a fresh interpreter and fails if
+
+- the cumulative import time of push_config exceeds the budget, or
+- importing it loads Netmiko (which must only be imported on first use).
+
+Usage:
+    python3 check_import_time.py [--budget-ms 50] [--runs 5]
+
+The best of --runs is compared against the budget to filter out noise. The
+result is printed as JSON; the exit code is 1 on a regression.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPTS_DIR = os.path.join(os.path.dirname(BENCHMARK_DIR), 'Scripts')
+
+DEFAULT_BUDGET_MS = 50
+DEFAULT_RUNS = 5
+MODULE = 'push_config'
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)\s*$')
+PROBE = (
+    f"import json, sys, {MODULE}; "
+    "print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] == 'netmiko')))"
+)
+
+
+def measure_import() -> tuple:
+    """Return (cumulative import time in ms, Netmiko modules loaded) for one fresh import."""
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', PROBE],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True,
+    )
+    cumulative_us = None
+    for line in completed.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if match and match.group(2) == MODULE:
+            cumulative_us = int(match.group(1))
+    if cumulative_us is None:
+        raise RuntimeError(f"No import time reported for {MODULE}")
+    return cumulative_us / 1000, json.loads(completed.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import time of push_config.py.")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"Maximum cumulative import time in ms (default: {DEFAULT_BUDGET_MS})")
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS,
+                        help=f"Fresh imports to take the best of (default: {DEFAULT_RUNS})")
+    args = parser.parse_args()
+
+    timings = []
+    netmiko_modules = []
+    for _ in range(max(1, args.runs)):
+        import_ms, netmiko_modules = measure_import()
+        timings.append(round(import_ms, 2))
+
+    best = min(timings)
+    errors = []
+    if best > args.budget_ms:
+        errors.append(f"{MODULE} imports in {best}ms, budget is {args.budget_ms}ms")
+    if netmiko_modules:
+        errors.append(f"{MODULE} imports Netmiko at module level ({len(netmiko_modules)} modules)")
+
+    print(json.dumps({
+        'status': 'failed' if errors else 'success',
+        'module': MODULE,
+        'import_ms': best,
+        'runs_ms': timings,
+        'budget_ms': args.budget_ms,
+        'errors': errors,
+    }, indent=2))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()
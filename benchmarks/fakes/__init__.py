@@ -0,0 +1,7 @@
+"""Local stand-ins for the devices and APIs the automation talks to."""
+
+from .catalyst_center import FakeCatalystCenter
+from .ios_xe import FakeIosXeServer
+from .netbox import FakeNetbox
+
+__all__ = ['FakeCatalystCenter', 'FakeIosXeServer', 'FakeNetbox']
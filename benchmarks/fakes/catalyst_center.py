@@ -0,0 +1,137 @@
+"""
+Mock Catalyst Center API serving the endpoints CreateIps.Dnac uses.
+
+    POST /dna/system/api/v1/auth/token           -> {"Token": "..."}
+    GET  /dna/intent/api/v1/onboarding/pnp-device -> PnP devices for the
+         requested serialNumber values (one or many), each with a
+         clientAddress HTTP header carrying a generated IP address
+
+Dnac only speaks HTTPS, so the server uses a throwaway self-signed
+certificate. Every request can be delayed to model API latency.
+"""
+
+import datetime
+import json
+import ssl
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+
+def self_signed_context() -> ssl.SSLContext:
+    """Server SSL context with a freshly generated certificate for localhost."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'localhost')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    certificate = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    with tempfile.NamedTemporaryFile('wb', suffix='.pem') as pem:
+        pem.write(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        ))
+        pem.write(certificate.public_bytes(serialization.Encoding.PEM))
+        pem.flush()
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(pem.name)
+    return context
+
+
+def _ip_for(serial: str) -> str:
+    value = sum(serial.encode()) * 7919 % (254 * 254)
+    return f"10.{100 + len(serial) % 100}.{value // 254}.{value % 254 + 1}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        self.server.count('auth')
+        if urlparse(self.path).path != '/dna/system/api/v1/auth/token':
+            return self._send(404, {})
+        self._send(200, {'Token': 'fake-token'})
+
+    def do_GET(self):
+        self.server.count('pnp')
+        url = urlparse(self.path)
+        if url.path != '/dna/intent/api/v1/onboarding/pnp-device':
+            return self._send(404, {})
+        if self.headers.get('x-auth-token') != 'fake-token':
+            return self._send(401, {'error': 'invalid token'})
+        serials = parse_qs(url.query).get('serialNumber', [])
+        self._send(200, [
+            {'deviceInfo': {
+                'serialNumber': serial,
+                'httpHeaders': [{'key': 'clientAddress', 'value': _ip_for(serial)}],
+            }}
+            for serial in serials
+        ])
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.requests = {}
+        self.lock = threading.Lock()
+
+    def count(self, kind):
+        with self.lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeCatalystCenter:
+    """
+    Threaded HTTPS server; use `host` (host:port) as the Dnac host.
+
+    :param latency: Seconds to wait before answering each request.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.server = _Server((host, port), latency)
+        self.server.socket = self_signed_context().wrap_socket(self.server.socket, server_side=True)
+        address = self.server.server_address
+        self.host = f"{address[0]}:{address[1]}"
+
+    @property
+    def requests(self):
+        return dict(self.server.requests)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,210 @@
+"""
+SSH server that behaves enough like an IOS-XE switch for Netmiko.
+
+Every login lands in privileged EXEC mode ("<hostname>#"). The server echoes
+input like a terminal, understands configure terminal / interface-style
+sub-modes / exit / end, answers "show running-config" with a running config
+that grows with the commands pushed to it, and "write mem" with the usual
+"[OK]". Each command and each login can be delayed to model device latency.
+
+Each device is a loopback address: the server listens on the same port on
+every address it is given and keeps a separate running config per address.
+"""
+
+import selectors
+import socket
+import threading
+import time
+
+import paramiko
+
+CONFIG_SECTIONS = ('interface ', 'router ', 'line ', 'vlan ', 'ip access-list ', 'aaa group server ')
+
+BASE_CONFIG = """Building configuration...
+
+Current configuration : 1024 bytes
+!
+version 17.9
+service timestamps debug datetime msec
+service timestamps log datetime msec
+!
+hostname {hostname}
+!
+interface GigabitEthernet1/0/1
+ description Uplink
+!
+line vty 0 15
+ transport input ssh
+!
+"""
+
+
+class _Server(paramiko.ServerInterface):
+    def __init__(self):
+        self.shell_requested = threading.Event()
+
+    def check_auth_password(self, username, password):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return 'password'
+
+    def check_channel_request(self, kind, chanid):
+        if kind == 'session':
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_pty_request(self, *args):
+        return True
+
+    def check_channel_shell_request(self, channel):
+        self.shell_requested.set()
+        return True
+
+
+class _Session:
+    """Command interpreter for one SSH shell."""
+
+    def __init__(self, channel, hostname, command_latency, config_lines):
+        self.channel = channel
+        self.hostname = hostname
+        self.command_latency = command_latency
+        self.config_lines = config_lines
+        self.modes = []
+        self.last_cr = False
+
+    @property
+    def prompt(self):
+        if not self.modes:
+            return f"{self.hostname}#"
+        return f"{self.hostname}({self.modes[-1]})#"
+
+    def execute(self, line):
+        command = line.strip()
+        if self.command_latency:
+            time.sleep(self.command_latency)
+        if not command:
+            return ''
+
+        if not self.modes:
+            if command.startswith(('conf t', 'configure terminal')):
+                self.modes.append('config')
+                return 'Enter configuration commands, one per line.  End with CNTL/Z.\n'
+            if command.startswith(('show run', 'sh run')):
+                return BASE_CONFIG.format(hostname=self.hostname) + ''.join(
+                    f"{text}\n" for text in self.config_lines
+                ) + 'end\n'
+            if command.startswith(('write', 'copy run')):
+                return 'Building configuration...\n[OK]\n'
+            return ''
+
+        if command == 'end':
+            self.modes = []
+        elif command == 'exit':
+            self.modes.pop()
+        else:
+            if command.startswith(CONFIG_SECTIONS):
+                self.modes = ['config', 'config-if' if command.startswith('interface ') else 'config-sub']
+            indent = ' ' if len(self.modes) > 1 and not command.startswith(CONFIG_SECTIONS) else ''
+            self.config_lines.append(indent + command)
+        return ''
+
+    def run(self):
+        self.channel.send(f"\r\n{self.prompt}")
+        buffer = ''
+        while True:
+            data = self.channel.recv(4096)
+            if not data:
+                return
+            for char in data.decode(errors='ignore'):
+                if char in '\r\n':
+                    # A CRLF line ending is one command, not an empty one after it
+                    if char == '\n' and buffer == '' and self.last_cr:
+                        self.last_cr = False
+                        continue
+                    self.last_cr = char == '\r'
+                    output = self.execute(buffer)
+                    buffer = ''
+                    self.channel.send('\r\n' + output.replace('\n', '\r\n') + self.prompt)
+                else:
+                    self.last_cr = False
+                    buffer += char
+                    self.channel.send(char)
+
+
+class FakeIosXeServer:
+    """
+    Threaded SSH server emulating IOS-XE devices on one TCP port.
+
+    Every address in hosts is one device with its own running config and the
+    hostname sw<N>, numbered in the order of hosts. Addresses other than
+    127.0.0.1 need Linux, where all of 127.0.0.0/8 is local.
+
+    :param hosts: Device addresses to listen on, all with the same port.
+    :param command_latency: Seconds to wait before answering each command.
+    :param login_latency: Seconds to wait before accepting a new session.
+    """
+
+    def __init__(self, hosts=('127.0.0.1',), port=0, command_latency=0.0, login_latency=0.0):
+        self.command_latency = command_latency
+        self.login_latency = login_latency
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.hostnames = {host: f"sw{index}" for index, host in enumerate(hosts, 1)}
+        self.config_lines = {host: [] for host in hosts}
+        self.sessions = 0
+        self.selector = selectors.DefaultSelector()
+        self.socks = []
+        for host in hosts:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((host, port))
+            sock.listen(256)
+            sock.setblocking(False)
+            # The first bind picks the port when none is given
+            port = sock.getsockname()[1]
+            self.selector.register(sock, selectors.EVENT_READ)
+            self.socks.append(sock)
+        self.address = self.socks[0].getsockname()
+        self._stopped = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        for sock in self.socks:
+            sock.close()
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                events = self.selector.select(timeout=0.5)
+            except (OSError, ValueError):
+                return
+            for key, _ in events:
+                try:
+                    client, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                client.setblocking(True)
+                threading.Thread(target=self._handle, args=(client,), daemon=True).start()
+
+    def _handle(self, client):
+        host = client.getsockname()[0]
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        server = _Server()
+        try:
+            if self.login_latency:
+                time.sleep(self.login_latency)
+            transport.start_server(server=server)
+            channel = transport.accept(30)
+            if channel is None or not server.shell_requested.wait(30):
+                return
+            self.sessions += 1
+            _Session(channel, self.hostnames[host], self.command_latency, self.config_lines[host]).run()
+        except (EOFError, OSError, paramiko.SSHException):
+            pass
+        finally:
+            transport.close()
@@ -0,0 +1,185 @@
+"""
+Mock NetBox REST API for the calls made through pynetbox.
+
+    GET   /api/                    -> API root (with the API-Version header)
+    GET   /api/status/             -> version information
+    GET   /api/dcim/devices/       -> paginated device list, filtered by any
+                                      number of name= and an optional status=
+    PATCH /api/dcim/devices/       -> bulk update, a list of {"id", ...}
+    PATCH /api/dcim/devices/<id>/  -> single update
+    GET   /api/dcim/interfaces/    -> each device's uplink, filtered by any
+                                      number of device_id= and an optional label=
+    GET   /api/ipam/vlans/         -> the MGMT VLAN, filtered by an optional name=
+
+Devices live in memory and are generated as sw<N> with status "planned",
+a primary IPv4 address and one interface labelled "Uplink".
+Every request can be delayed to model API latency.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+API_VERSION = '4.1'
+DEVICE_PATH_RE = re.compile(r'^/api/dcim/devices/(?:(\d+)/)?$')
+INTERFACE_PATH = '/api/dcim/interfaces/'
+VLAN_PATH = '/api/ipam/vlans/'
+MGMT_VLAN = {'id': 1, 'name': 'MGMT', 'vid': 100}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, code, body):
+        payload = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('API-Version', API_VERSION)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _device(self, device):
+        return {**device, 'url': f"{self.server.base_url}/api/dcim/devices/{device['id']}/",
+                'status': {'value': device['status'], 'label': device['status'].title()}}
+
+    def _interface(self, device):
+        return {
+            'id': device['id'],
+            'url': f"{self.server.base_url}{INTERFACE_PATH}{device['id']}/",
+            'name': 'GigabitEthernet1/0/1',
+            'label': 'Uplink',
+            'device': {'id': device['id'], 'name': device['name'],
+                       'url': f"{self.server.base_url}/api/dcim/devices/{device['id']}/"},
+        }
+
+    def _send_page(self, url, query, objects):
+        limit = int(query.get('limit', ['50'])[0]) or len(objects) or 1
+        offset = int(query.get('offset', ['0'])[0])
+        page = objects[offset:offset + limit]
+        next_url = None
+        if offset + limit < len(objects):
+            params = {key: value for key, value in query.items() if key not in ('limit', 'offset')}
+            params.update(limit=[limit], offset=[offset + limit])
+            next_url = f"{self.server.base_url}{url.path}?{urlencode(params, doseq=True)}"
+        self._send(200, {
+            'count': len(objects),
+            'next': next_url,
+            'previous': None,
+            'results': page,
+        })
+
+    def do_GET(self):
+        self.server.count('GET')
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if url.path == '/api/':
+            return self._send(200, {'dcim': f"{self.server.base_url}/api/dcim/"})
+        if url.path == '/api/status/':
+            return self._send(200, {'netbox-version': f"{API_VERSION}.0"})
+        if url.path == VLAN_PATH:
+            names = set(query.get('name', []))
+            vlans = [MGMT_VLAN] if not names or MGMT_VLAN['name'] in names else []
+            return self._send_page(url, query, vlans)
+        if url.path == INTERFACE_PATH:
+            device_ids = {int(device_id) for device_id in query.get('device_id', [])}
+            labels = set(query.get('label', []))
+            interfaces = [
+                self._interface(device) for device in self.server.devices.values()
+                if (not device_ids or device['id'] in device_ids) and (not labels or 'Uplink' in labels)
+            ]
+            return self._send_page(url, query, interfaces)
+        if not DEVICE_PATH_RE.match(url.path):
+            return self._send(404, {'detail': 'Not found.'})
+
+        names = set(query.get('name', []))
+        statuses = set(query.get('status', []))
+        devices = [
+            self._device(device) for device in self.server.devices.values()
+            if (not names or device['name'] in names) and (not statuses or device['status'] in statuses)
+        ]
+        self._send_page(url, query, devices)
+
+    def do_PATCH(self):
+        self.server.count('PATCH')
+        match = DEVICE_PATH_RE.match(urlparse(self.path).path)
+        if not match:
+            return self._send(404, {'detail': 'Not found.'})
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'null')
+        updates = body if isinstance(body, list) else [{**body, 'id': int(match.group(1))}]
+
+        updated = []
+        with self.server.lock:
+            for update in updates:
+                device = self.server.devices.get(update.get('id'))
+                if device is None:
+                    return self._send(400, {'detail': f"Device {update.get('id')} not found."})
+                device.update({key: value for key, value in update.items() if key != 'id'})
+                updated.append(self._device(device))
+        self._send(200, updated if isinstance(body, list) else updated[0])
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency):
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.devices = {}
+        self.requests = {}
+        self.lock = threading.Lock()
+        self.base_url = f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, method):
+        with self.lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakeNetbox:
+    """
+    Threaded HTTP server; use `url` as the NetBox URL.
+
+    :param devices: Number of planned devices (sw1 .. swN) to create.
+    :param latency: Seconds to wait before answering each request.
+    """
+
+    def __init__(self, devices=0, host='127.0.0.1', port=0, latency=0.0):
+        self.server = _Server((host, port), latency)
+        self.url = self.server.base_url
+        self.add_devices(devices)
+
+    def add_devices(self, count):
+        with self.server.lock:
+            start = len(self.server.devices) + 1
+            for device_id in range(start, start + count):
+                self.server.devices[device_id] = {
+                    'id': device_id, 'name': f"sw{device_id}", 'status': 'planned',
+                    'primary_ip4': {
+                        'id': device_id,
+                        'address': f"10.{device_id // 65536 % 256}.{device_id // 256 % 256}.{device_id % 256}/16",
+                    },
+                }
+
+    @property
+    def devices(self):
+        return self.server.devices
+
+    @property
+    def requests(self):
+        return dict(self.server.requests)
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
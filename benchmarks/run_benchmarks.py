@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmarks against local stand-ins for devices, NetBox and Catalyst Center.
+
+Scenarios:
+    push_config      push_config_batch() to N devices on the fake IOS-XE SSH server
+    catalyst_center  CreateIps.Dnac.get_device_ip_addresses() for N serial numbers
+                     against the mock Catalyst Center (needs NetBox, see --netbox-root)
+    netbox_update    pyATS NetboxUpdate.update_device_status() for N devices
+                     against the mock NetBox API (needs pyATS)
+    add_switches     AddSwitchesToSite.run() with N serial numbers, including
+                     CreateIps, against the NetBox database and the mock Catalyst
+                     Center; rolled back afterwards (needs NetBox, see --netbox-root)
+    create_ips       CreateIps.run() for N planned devices against the NetBox
+                     database and the mock Catalyst Center; rolled back
+                     afterwards (needs NetBox, see --netbox-root)
+    render_config    render_config.render_inventory() of the Day 0 template for
+                     N devices against the mock NetBox API (needs Jinja2 and pynetbox)
+
+Usage:
+    python3 run_benchmarks.py [--scenarios push_config,netbox_update] [--scales 1,10,100,1000]
+                              [--repeat 3] [--output results.json]
+
+Each scenario and scale runs in its own process so that peak RSS is measured
+per run. The fakes run in this process. The report is printed as JSON:
+
+    {"parameters": {...},
+     "results": [{"scenario": "push_config", "scale": 100, "duration": 12.3,
+                  "throughput": 8.1, "latency_p50": 2.4, "latency_p95": 3.1,
+                  "peak_rss_mb": 61.2, "errors": 0, "requests": {...}}, ...]}
+
+For push_config the latency is per device; for the other scenarios it is
+per call of the entry point, repeated --repeat times. Throughput is devices
+(or serial numbers) handled per second. A scenario whose dependencies are
+not installed is reported with a "skipped" reason instead.
+
+Each fake device of push_config is its own loopback address with its own
+running config, which needs Linux (all of 127.0.0.0/8 is local there).
+
+The pyATS job itself (test_network.py) has no scenario: Unicon and the Genie
+parsers need far more of IOS-XE than the fake SSH server emulates. Its
+NetBox step is covered by netbox_update.
+"""
+
+import argparse
+import importlib
+import json
+import math
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from types import SimpleNamespace
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+
+SCENARIOS = ('push_config', 'catalyst_center', 'netbox_update', 'add_switches', 'create_ips',
+             'render_config')
+DEFAULT_SCALES = (1, 10, 100, 1000)
+DEFAULT_REPEAT = 3
+DEFAULT_WORKERS = 20
+DEFAULT_COMMANDS = 5
+WORKER_TIMEOUT = 3600
+
+FAKE_USER = 'admin'
+FAKE_PASSWORD = 'admin'
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile, 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    if sys.platform == 'darwin':
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def measure(calls: int, items_per_call: int, call) -> dict:
+    """Run call() several times and report per-call latency and item throughput."""
+    latencies = []
+    errors = 0
+    start = time.monotonic()
+    for _ in range(calls):
+        call_start = time.monotonic()
+        errors += call() or 0
+        latencies.append(time.monotonic() - call_start)
+    duration = time.monotonic() - start
+    return {
+        'duration': duration,
+        'items': calls * items_per_call,
+        'latencies': latencies,
+        'errors': errors,
+    }
+
+
+def device_address(index: int) -> str:
+    """Loopback address of the fake IOS-XE device with the given index."""
+    return f"127.0.{index // 250}.{index % 250 + 1}"
+
+
+def setup_netbox(netbox_root: str):
+    """Make the NetBox Django project importable, as `manage.py nbshell` would."""
+    if not netbox_root:
+        raise ImportError("NetBox is not available, pass --netbox-root")
+    sys.path.insert(0, netbox_root)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'netbox.settings')
+    import django
+    django.setup()
+
+
+# Scenario workers, each run in a separate process
+
+def bench_push_config(args) -> dict:
+    os.environ.update({
+        'DEVICE_USERNAME': FAKE_USER,
+        'DEVICE_PASSWORD': FAKE_PASSWORD,
+        'DEVICE_PORT': str(args.ssh_port),
+        # Keep the session daemon and the running-config cache out of the measurement
+        'PUSH_CONFIG_SOCKET': os.path.join(tempfile.gettempdir(), f"bench-{uuid.uuid4().hex}.sock"),
+        'PUSH_CONFIG_CACHE_DIR': '',
+    })
+    sys.path.insert(0, os.path.join(REPO_DIR, 'Scripts'))
+    push_config = importlib.import_module('push_config')
+
+    commands = [f"logging host 198.18.133.{i + 1}" for i in range(args.commands)]
+    devices = [
+        {'host': device_address(index), 'device_type': 'cisco_xe', 'commands': commands}
+        for index in range(args.scale)
+    ]
+    latencies = []
+    start = time.monotonic()
+    summary = push_config.push_config_batch(
+        devices, workers=args.workers, on_result=lambda result: latencies.append(result['duration'])
+    )
+    return {
+        'duration': time.monotonic() - start,
+        'items': args.scale,
+        'latencies': latencies,
+        'errors': summary['failed'],
+    }
+
+
+def bench_catalyst_center(args) -> dict:
+    setup_netbox(args.netbox_root)
+    from scripts import CreateIps
+
+    dnac = CreateIps.Dnac(args.dnac_host, FAKE_USER, FAKE_PASSWORD)
+    serials = [f"FOC{i:08d}" for i in range(args.scale)]
+
+    def call():
+        found = dnac.get_device_ip_addresses(serials)
+        return len(serials) - len(found)
+
+    return measure(args.repeat, args.scale, call)
+
+
+def bench_netbox_update(args) -> dict:
+    sys.path.insert(0, os.path.join(REPO_DIR, 'pyATS'))
+    test_network = importlib.import_module('test_network')
+
+    names = [f"sw{i}" for i in range(1, args.scale + 1)]
+    testbed = SimpleNamespace(devices={name: None for name in names})
+
+    def _abort(message=''):
+        raise RuntimeError(message)
+
+    section = SimpleNamespace(failed=_abort, skipped=_abort, passed=lambda *a, **k: None)
+
+    def call():
+        try:
+            test_network.NetboxUpdate.update_device_status(
+                section, testbed, args.netbox_url, 'benchmark-token', names
+            )
+        except RuntimeError:
+            return 1
+        return 0
+
+    return measure(args.repeat, args.scale, call)
+
+
+def bench_add_switches(args) -> dict:
+    setup_netbox(args.netbox_root)
+    from django.db import transaction
+    from dcim.models import DeviceRole, DeviceType, InterfaceTemplate, Site
+    from tenancy.models import Tenant
+    from scripts import ScriptConfig
+    switches = importlib.import_module('scripts.02_switches')
+
+    # The scripts read vars.json; point them at the mock Catalyst Center instead
+    config = ScriptConfig.ScriptConfig.from_dict({
+        'NETBOX_API': 'http://netbox.benchmark',
+        'DNAC_HOST': args.dnac_host,
+        'DNAC_USER': FAKE_USER,
+        'DNAC_PASSWORD': FAKE_PASSWORD,
+    })
+    ScriptConfig.load_config = lambda *required, **kwargs: config.require(*required)
+
+    uplink = InterfaceTemplate.objects.filter(device_type__isnull=False).first()
+    if uplink is None:
+        raise ImportError("NetBox has no device type with interface templates")
+    data = {
+        'tenant': Tenant.objects.first(),
+        'site': Site.objects.first(),
+        'device_type': DeviceType.objects.get(pk=uplink.device_type_id),
+        'device_role': DeviceRole.objects.first(),
+        'device_uplink': uplink,
+        'bulk': args.bulk,
+    }
+
+    class Rollback(Exception):
+        pass
+
+    def call():
+        serials = [f"BENCH{uuid.uuid4().hex[:8].upper()}{i:05d}" for i in range(args.scale)]
+        script = switches.AddSwitchesToSite()
+        try:
+            with transaction.atomic():
+                script.run({**data, 'serial_numbers': ','.join(serials)}, commit=False)
+                raise Rollback
+        except Rollback:
+            pass
+        return 0
+
+    return measure(args.repeat, args.scale, call)
+
+
+def bench_create_ips(args) -> dict:
+    setup_netbox(args.netbox_root)
+    from django.db import transaction
+    from dcim.models import Device, DeviceRole, DeviceType, Interface, InterfaceTemplate, Site
+    from ipam.models import VLAN
+    from tenancy.models import Tenant
+    from scripts import CreateIps, ScriptConfig
+
+    config = ScriptConfig.ScriptConfig.from_dict({
+        'DNAC_HOST': args.dnac_host,
+        'DNAC_USER': FAKE_USER,
+        'DNAC_PASSWORD': FAKE_PASSWORD,
+    })
+    ScriptConfig.load_config = lambda *required, **kwargs: config.require(*required)
+
+    uplink = InterfaceTemplate.objects.filter(device_type__isnull=False).first()
+    if uplink is None:
+        raise ImportError("NetBox has no device type with interface templates")
+    if not VLAN.objects.filter(name="MGMT").exists():
+        raise ImportError("NetBox has no MGMT VLAN")
+    tenant = Tenant.objects.first()
+    site = Site.objects.first()
+    device_type = DeviceType.objects.get(pk=uplink.device_type_id)
+    role = DeviceRole.objects.first()
+
+    class Rollback(Exception):
+        pass
+
+    latencies = []
+    for _ in range(args.repeat):
+        run_id = uuid.uuid4().hex[:8].upper()
+        try:
+            with transaction.atomic():
+                # Planned devices as AddSwitchesToSite leaves them, outside the measurement
+                devices = [
+                    Device.objects.create(
+                        name=f"bench-{run_id}-{i}", site=site, tenant=tenant, role=role,
+                        device_type=device_type, serial=f"BENCH{run_id}{i:05d}", status="planned",
+                    )
+                    for i in range(args.scale)
+                ]
+                Interface.objects.filter(device__in=devices, name=uplink.name).update(label="Uplink")
+
+                call_start = time.monotonic()
+                CreateIps.CreateIps().run({'tenant': tenant, 'bulk': args.bulk}, commit=False)
+                latencies.append(time.monotonic() - call_start)
+                raise Rollback
+        except Rollback:
+            pass
+    return {
+        'duration': sum(latencies),
+        'items': args.repeat * args.scale,
+        'latencies': latencies,
+        'errors': 0,
+    }
+
+
+def bench_render_config(args) -> dict:
+    sys.path.insert(0, os.path.join(REPO_DIR, 'Scripts'))
+    render_config = importlib.import_module('render_config')
+    importlib.import_module('jinja2')
+
+    template = os.path.join(REPO_DIR, 'Ansible', 'templates', 'Ansible_Day0-Template.json')
+    names = [f"sw{i}" for i in range(1, args.scale + 1)]
+
+    def call():
+        _, errors = render_config.render_inventory(
+            template, names=names, netbox_url=args.netbox_url, netbox_token='benchmark-token'
+        )
+        return len(errors)
+
+    return measure(args.repeat, args.scale, call)
+
+
+BENCHMARKS = {
+    'push_config': bench_push_config,
+    'catalyst_center': bench_catalyst_center,
+    'netbox_update': bench_netbox_update,
+    'add_switches': bench_add_switches,
+    'create_ips': bench_create_ips,
+    'render_config': bench_render_config,
+}
+
+
+def run_worker(args):
+    result = {'scenario': args.worker, 'scale': args.scale}
+    try:
+        raw = BENCHMARKS[args.worker](args)
+    except ImportError as e:
+        result['skipped'] = str(e)
+    else:
+        duration = raw['duration']
+        result.update({
+            'duration': round(duration, 3),
+            'throughput': round(raw['items'] / duration, 2) if duration else 0.0,
+            'latency_p50': round(percentile(raw['latencies'], 50), 3),
+            'latency_p95': round(percentile(raw['latencies'], 95), 3),
+            'errors': raw['errors'],
+        })
+    result['peak_rss_mb'] = peak_rss_mb()
+    print(json.dumps(result), flush=True)
+
+
+# Orchestration
+
+def start_fakes(args, scenarios: list) -> dict:
+    sys.path.insert(0, BENCHMARK_DIR)
+    from fakes import FakeCatalystCenter, FakeIosXeServer, FakeNetbox
+
+    fakes = {}
+    if 'push_config' in scenarios:
+        fakes['ssh'] = FakeIosXeServer(
+            hosts=[device_address(index) for index in range(max(args.scales))],
+            command_latency=args.command_latency, login_latency=args.login_latency,
+        ).start()
+    if {'catalyst_center', 'add_switches', 'create_ips'} & set(scenarios):
+        fakes['catalyst_center'] = FakeCatalystCenter(latency=args.api_latency).start()
+    if {'netbox_update', 'render_config'} & set(scenarios):
+        fakes['netbox'] = FakeNetbox(devices=max(args.scales), latency=args.api_latency).start()
+    return fakes
+
+
+def worker_command(args, fakes: dict, scenario: str, scale: int) -> list:
+    command = [
+        sys.executable, os.path.abspath(__file__), '--worker', scenario,
+        '--scale', str(scale), '--repeat', str(args.repeat),
+        '--workers', str(args.workers), '--commands', str(args.commands),
+    ]
+    if 'ssh' in fakes:
+        command += ['--ssh-port', str(fakes['ssh'].address[1])]
+    if 'catalyst_center' in fakes:
+        command += ['--dnac-host', fakes['catalyst_center'].host]
+    if 'netbox' in fakes:
+        command += ['--netbox-url', fakes['netbox'].url]
+    if args.netbox_root:
+        command += ['--netbox-root', args.netbox_root]
+    if args.bulk:
+        command.append('--bulk')
+    return command
+
+
+def worker_env() -> dict:
+    # requests lets a CA bundle from the environment override session.verify,
+    # which would make the clients reject the mock's self-signed certificate
+    return {
+        key: value for key, value in os.environ.items()
+        if key not in ('REQUESTS_CA_BUNDLE', 'CURL_CA_BUNDLE')
+    }
+
+
+def run_scenario(args, fakes: dict, scenario: str, scale: int) -> dict:
+    servers = [fake for fake in fakes.values() if hasattr(fake, 'requests')]
+    before = [fake.requests for fake in servers]
+    try:
+        completed = subprocess.run(
+            worker_command(args, fakes, scenario, scale),
+            capture_output=True, text=True, timeout=WORKER_TIMEOUT, env=worker_env(),
+        )
+    except subprocess.TimeoutExpired:
+        return {'scenario': scenario, 'scale': scale, 'failed': f"Timed out after {WORKER_TIMEOUT}s"}
+    try:
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        stderr = completed.stderr.strip().splitlines()
+        error = stderr[-1] if stderr else f"Exit code {completed.returncode}"
+        return {'scenario': scenario, 'scale': scale, 'failed': error}
+
+    requests = {}
+    for fake, counts in zip(servers, before):
+        for kind, count in fake.requests.items():
+            delta = count - counts.get(kind, 0)
+            if delta:
+                requests[kind] = requests.get(kind, 0) + delta
+    if requests:
+        result['requests'] = requests
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the automation entry points against local fakes.")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})")
+    parser.add_argument('--scales', default=','.join(map(str, DEFAULT_SCALES)),
+                        help="Comma-separated device counts (default: 1,10,100,1000)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f"Calls per scale for single-call scenarios (default: {DEFAULT_REPEAT})")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"push_config batch concurrency (default: {DEFAULT_WORKERS})")
+    parser.add_argument('--commands', type=int, default=DEFAULT_COMMANDS,
+                        help=f"Commands per push (default: {DEFAULT_COMMANDS})")
+    parser.add_argument('--command-latency', type=float, default=0.0,
+                        help="Fake device delay per command in seconds")
+    parser.add_argument('--login-latency', type=float, default=0.0,
+                        help="Fake device delay per SSH login in seconds")
+    parser.add_argument('--api-latency', type=float, default=0.0,
+                        help="Mock NetBox / Catalyst Center delay per request in seconds")
+    parser.add_argument('--netbox-root', default=os.environ.get('NETBOX_ROOT'),
+                        help="NetBox project directory, e.g. /opt/netbox/netbox (env NETBOX_ROOT)")
+    parser.add_argument('--bulk', action='store_true', help="Run add_switches and create_ips in bulk mode")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    # Internal: run one scenario in a worker process
+    parser.add_argument('--worker', choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument('--scale', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ssh-port', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--dnac-host', help=argparse.SUPPRESS)
+    parser.add_argument('--netbox-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    args.scales = [int(scale) for scale in args.scales.split(',')]
+
+    fakes = start_fakes(args, scenarios)
+    results = []
+    try:
+        for scenario in scenarios:
+            for scale in args.scales:
+                result = run_scenario(args, fakes, scenario, scale)
+                print(f"{scenario} x{scale}: {json.dumps(result)}", file=sys.stderr, flush=True)
+                results.append(result)
+    finally:
+        for fake in fakes.values():
+            fake.stop()
+
+    report = {
+        'parameters': {
+            'scenarios': scenarios,
+            'scales': args.scales,
+            'repeat': args.repeat,
+            'workers': args.workers,
+            'commands': args.commands,
+            'command_latency': args.command_latency,
+            'login_latency': args.login_latency,
+            'api_latency': args.api_latency,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Copyright (c) 2026 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.1 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied.
+"""
+
+# Data-driven device checks for test_network.py. The catalogue format is
+# described in README.md. All command outputs are collected into a
+# CommandCache before any check runs, with each unique command run once per
+# device, so adding checks only adds evaluation time, no device round trips.
+
+import os
+import re
+
+import yaml
+
+DEFAULT_CATALOGUE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checks.yml")
+
+OPERATORS = ("exists", "equals", "one_of", "matches", "contains", "min_count", "each")
+
+_MISSING = object()
+_VARIABLE_RE = re.compile(r"\{(\w+)\}")
+
+
+class CatalogueError(ValueError):
+    """The check catalogue is missing or malformed."""
+
+
+class CommandError(Exception):
+    """A command needed by a check could not be run or parsed on a device."""
+
+
+def _validate_check(check, index):
+    name = check.get("name") if isinstance(check, dict) else None
+    if not name or not check.get("command"):
+        raise CatalogueError(f"Check #{index} needs a name and a command")
+    assertions = check.get("assert")
+    if not isinstance(assertions, list) or not assertions:
+        raise CatalogueError(f"Check '{name}' needs a list of assertions")
+    for assertion in assertions:
+        operators = [op for op in OPERATORS if op in (assertion or {})]
+        if len(operators) != 1:
+            raise CatalogueError(f"Each assertion of check '{name}' needs exactly one of {', '.join(OPERATORS)}")
+    return {
+        "name": name,
+        "description": check.get("description", ""),
+        "command": check["command"],
+        "parse": bool(check.get("parse", True)),
+        "required": bool(check.get("required", False)),
+        "assert": assertions,
+    }
+
+
+def load_catalogue(path=DEFAULT_CATALOGUE):
+    """
+    Load and validate a check catalogue.
+
+    :param path: Path of the YAML catalogue.
+    :return: Tuple of (checks, variables): the list of check dicts with
+             defaults applied, and the dict of catalogue variables.
+    :raises CatalogueError: If the file cannot be read or a check is malformed.
+    """
+    try:
+        with open(path) as f:
+            catalogue = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise CatalogueError(f"Cannot load check catalogue {path}: {e}") from e
+
+    checks = [_validate_check(check, index) for index, check in enumerate(catalogue.get("checks") or [], 1)]
+    names = [check["name"] for check in checks]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise CatalogueError(f"Duplicate check names: {', '.join(duplicates)}")
+    return checks, dict(catalogue.get("variables") or {})
+
+
+def required_commands(checks):
+    """Unique (command, parse) pairs needed by the checks, in catalogue order."""
+    return list(dict.fromkeys((check["command"], check["parse"]) for check in checks))
+
+
+class CommandCache:
+    """
+    Command outputs per device, collected once and shared by all checks.
+
+    collect() is called concurrently for different devices; each device is
+    only ever collected by one thread at a time.
+    """
+
+    def __init__(self):
+        self._outputs = {}
+        self._errors = {}
+
+    def collect(self, device, commands):
+        """
+        Run the commands not cached yet on a device, one after the other.
+
+        :param device: Connected pyATS device.
+        :param commands: Iterable of (command, parse) pairs.
+        :return: Number of commands that failed.
+        """
+        failed = 0
+        for command, parse in commands:
+            key = (device.name, command, parse)
+            if key in self._outputs or key in self._errors:
+                continue
+            try:
+                self._outputs[key] = device.parse(command) if parse else device.execute(command)
+            except Exception as e:
+                self._errors[key] = str(e) or type(e).__name__
+                failed += 1
+        return failed
+
+    def outputs(self, device_name):
+        """All cached outputs of a device, by command; raw outputs as "<command> (raw)"."""
+        return {
+            command if parse else f"{command} (raw)": output
+            for (name, command, parse), output in self._outputs.items()
+            if name == device_name
+        }
+
+    def get(self, device_name, command, parse=True):
+        """
+        Cached output of a command on a device.
+
+        :raises CommandError: If the command failed or was never collected.
+        """
+        key = (device_name, command, parse)
+        if key in self._errors:
+            raise CommandError(f"'{command}' failed: {self._errors[key]}")
+        if key not in self._outputs:
+            raise CommandError(f"'{command}' was not collected")
+        return self._outputs[key]
+
+
+def substitute(value, variables):
+    """Replace "{name}" with catalogue variables in strings, lists and dicts."""
+    if isinstance(value, str):
+        return _VARIABLE_RE.sub(
+            lambda m: str(variables[m.group(1)]) if m.group(1) in variables else m.group(0), value
+        )
+    if isinstance(value, list):
+        return [substitute(item, variables) for item in value]
+    if isinstance(value, dict):
+        return {key: substitute(item, variables) for key, item in value.items()}
+    return value
+
+
+def _lookup(output, path):
+    value = output
+    for key in path:
+        if isinstance(value, dict):
+            # Genie uses string keys for VLAN ids and the like
+            value = value.get(key, value.get(str(key), _MISSING))
+        elif isinstance(value, list) and isinstance(key, int) and -len(value) <= key < len(value):
+            value = value[key]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            break
+    return value
+
+
+def _entries(value):
+    if isinstance(value, dict):
+        return list(value.values())
+    if isinstance(value, list):
+        return value
+    return []
+
+
+def _select(value, where):
+    def keep(entry):
+        return isinstance(entry, dict) and all(
+            re.search(pattern, str(entry.get(key, ""))) for key, pattern in where.items()
+        )
+
+    if isinstance(value, dict):
+        return {key: entry for key, entry in value.items() if keep(entry)}
+    return [entry for entry in _entries(value) if keep(entry)]
+
+
+def _check_assertion(assertion, output):
+    """Return None if the assertion holds, otherwise why it does not."""
+    path = assertion.get("path") or []
+    where = "/".join(str(key) for key in path) or "output"
+    value = _lookup(output, path)
+
+    if "exists" in assertion:
+        if (value is not _MISSING) != bool(assertion["exists"]):
+            return f"{where} {'not found' if assertion['exists'] else 'present'}"
+        return None
+    if value is _MISSING:
+        return f"{where} not found"
+
+    if "where" in assertion:
+        value = _select(value, assertion["where"])
+        where = f"{where} matching {assertion['where']}"
+
+    if "equals" in assertion:
+        if value != assertion["equals"]:
+            return f"{where} is {value!r}, expected {assertion['equals']!r}"
+    elif "one_of" in assertion:
+        if value not in assertion["one_of"]:
+            return f"{where} is {value!r}, expected one of {assertion['one_of']!r}"
+    elif "matches" in assertion:
+        if not isinstance(value, str) or not re.search(assertion["matches"], value):
+            return f"{where} does not match {assertion['matches']!r}"
+    elif "contains" in assertion:
+        if not isinstance(value, (str, list, dict)) or assertion["contains"] not in value:
+            return f"{where} does not contain {assertion['contains']!r}"
+    elif "min_count" in assertion:
+        count = len(value) if isinstance(value, (dict, list)) else 0
+        if count < assertion["min_count"]:
+            return f"{where} has {count} entries, expected at least {assertion['min_count']}"
+    elif "each" in assertion:
+        for entry in _entries(value):
+            for key, expected in assertion["each"].items():
+                actual = entry.get(key) if isinstance(entry, dict) else None
+                if actual != expected:
+                    return f"{where} has {key}={actual!r}, expected {expected!r}"
+    return None
+
+
+def evaluate_check(check, command_cache, device_name, variables):
+    """
+    Evaluate all assertions of a check against the cached output of a device.
+
+    :return: List of failure messages, empty if the check passed.
+    :raises CommandError: If the command output is not available.
+    """
+    output = command_cache.get(device_name, check["command"], check["parse"])
+    failures = []
+    for assertion in substitute(check["assert"], variables):
+        reason = _check_assertion(assertion, output)
+        if reason:
+            failures.append(f"{assertion['message']} ({reason})" if assertion.get("message") else reason)
+    return failures
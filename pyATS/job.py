@@ -15,10 +15,13 @@ IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
 or implied.
 """
 
+import logging
 import os
-from pyats.contrib.creators.netbox import Netbox
-from pyats.easypy import run
+import time
+from pyats.easypy import Task, run
 from genie import testbed
+from snapshot_store import DEFAULT_SNAPSHOT_FEATURES
+from testbed_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_AGE, generate_testbed
 
 
 def _env_cli_credentials():
@@ -27,6 +30,54 @@ def _env_cli_credentials():
     password = os.getenv("CATALYSTCENTER_CLI_PASSWORD") or os.getenv("DNAC_CLI_PASSWORD")
     return user, password
 
+
+def _env_flag(name):
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def _site_key(device_name):
+    """Devices are named sw<site number>-<index>; group them by the prefix."""
+    return device_name.rsplit("-", 1)[0]
+
+
+def shard_testbed(tb, shards, by="site"):
+    """
+    Split a testbed dict into up to `shards` testbed dicts.
+
+    With by="site", devices of the same site stay in one shard and sites are
+    assigned largest first to the currently smallest shard. With by="size",
+    devices are split into contiguous chunks of equal size.
+
+    :param tb: Testbed dict as returned by generate_testbed().
+    :param shards: Number of shards to create.
+    :param by: "site" or "size".
+    :return: List of non-empty testbed dicts.
+    """
+    names = sorted(tb.get("devices", {}))
+    shards = max(1, min(shards, len(names)))
+
+    if by == "site":
+        groups = {}
+        for name in names:
+            groups.setdefault(_site_key(name), []).append(name)
+        buckets = [[] for _ in range(shards)]
+        for group in sorted(groups.values(), key=len, reverse=True):
+            min(buckets, key=len).extend(group)
+    else:
+        size = -(-len(names) // shards)
+        buckets = [names[i:i + size] for i in range(0, len(names), size)]
+
+    result = []
+    for bucket in buckets:
+        if not bucket:
+            continue
+        shard = {key: value for key, value in tb.items() if key not in ("devices", "topology")}
+        shard["devices"] = {name: tb["devices"][name] for name in bucket}
+        if "topology" in tb:
+            shard["topology"] = {name: tb["topology"][name] for name in bucket if name in tb["topology"]}
+        result.append(shard)
+    return result
+
 def main(runtime):
     netbox_url = os.getenv("NETBOX_API")
     netbox_token = os.getenv("NETBOX_TOKEN")
@@ -34,16 +85,54 @@ def main(runtime):
 
     cli_user, cli_password = _env_cli_credentials()
 
-    nb_testbed = Netbox(
+    tb = generate_testbed(
+        netbox_url,
+        netbox_token,
+        url_filter,
+        cli_user,
+        cli_password,
+        cache_dir=os.getenv("PYATS_TESTBED_CACHE_DIR", DEFAULT_CACHE_DIR),
+        max_age=int(os.getenv("PYATS_TESTBED_CACHE_MAX_AGE", DEFAULT_MAX_AGE)),
+    )
+    parameters = dict(
         netbox_url=netbox_url,
-        user_token=netbox_token,
-        def_user=cli_user,
-        def_pass=cli_password,
-        url_filter=url_filter,
-        verify=False
+        netbox_token=netbox_token,
+        max_workers=int(os.getenv("PYATS_MAX_WORKERS", "20")),
+        continue_on_connect_failure=_env_flag("PYATS_CONTINUE_ON_CONNECT_FAILURE"),
+        expected_ntp_peer=os.getenv("NTP_PEER"),
+        check_catalogue=os.getenv("PYATS_CHECKS"),
+        snapshot_dir=os.getenv("PYATS_SNAPSHOT_DIR"),
+        # One run id for all shards, so their snapshots can be compared as one run
+        snapshot_run=os.getenv("PYATS_SNAPSHOT_RUN") or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()),
+        snapshot_features=[
+            feature.strip()
+            for feature in os.getenv("PYATS_SNAPSHOT_FEATURES", ",".join(DEFAULT_SNAPSHOT_FEATURES)).split(",")
+            if feature.strip()
+        ],
     )
 
-    tb = nb_testbed._generate()
-    devices = testbed.load(tb)
+    shard_count = int(os.getenv("PYATS_SHARDS", "1"))
+    if shard_count <= 1:
+        devices = testbed.load(tb)
+        run(testscript="test_network.py", testbed=devices, runtime=runtime, **parameters)
+        return
 
-    run(testscript="test_network.py", testbed=devices, runtime=runtime, netbox_url=netbox_url, netbox_token=netbox_token)
+    # Each shard runs as its own easypy task (a separate process); easypy
+    # collects all task results into the single job report
+    shards = shard_testbed(tb, shard_count, by=os.getenv("PYATS_SHARD_BY", "site"))
+    tasks = [
+        Task(
+            testscript="test_network.py",
+            taskid=f"shard{index}",
+            testbed=testbed.load(shard),
+            runtime=runtime,
+            **parameters,
+        )
+        for index, shard in enumerate(shards, start=1)
+    ]
+    for task, shard in zip(tasks, shards):
+        logging.info(f"Starting {task.taskid} with {len(shard['devices'])} devices")
+        task.start()
+    for task in tasks:
+        task.wait()
+        logging.info(f"{task.taskid} finished: {task.result}")
@@ -0,0 +1,318 @@
+"""
+Copyright (c) 2026 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.1 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied.
+"""
+
+# Content-addressed store for device state snapshots taken by test_network.py.
+#
+#   <root>/objects/<aa>/<sha256>        zlib-compressed canonical JSON of one
+#                                       feature, shared by all snapshots that
+#                                       contain the same data
+#   <root>/snapshots/<device>/<run>.json  manifest: feature name -> hash
+#
+# Two snapshots are compared by their manifests first, so only the features
+# whose hashes differ are decompressed and diffed.
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from urllib.parse import quote, unquote
+
+DEFAULT_SNAPSHOT_DIR = ".snapshots"
+
+COMPRESSION_LEVEL = 6
+
+# Genie features learned per device when test_network.py takes a snapshot
+DEFAULT_SNAPSHOT_FEATURES = ("interface", "ntp", "vlan")
+
+# Keys that change on every run without being drift
+DEFAULT_IGNORE = (
+    r"(^|/)counters(/|$)",
+    r"(^|/)[^/]*(uptime|last_change|last_clear)(/|$)",
+    r"(^|/)(age|delay|offset|jitter|reach|dispersion|root_delay|root_dispersion|reference_time)(/|$)",
+)
+
+# Lines of raw command outputs (show running-config) that change without
+# any change to the configuration
+DEFAULT_IGNORE_LINES = (
+    r"^Building configuration",
+    r"^Current configuration : \d+ bytes",
+    r"^! (Last configuration change|NVRAM config last updated) at ",
+    r"^! No configuration change since last restart",
+    r"^ntp clock-period ",
+)
+
+
+def _canonical(data):
+    return json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()
+
+
+def _write_atomic(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+
+
+def strip_volatile(data, path=(), ignore=()):
+    """Copy of a JSON-like structure without the dict keys whose "/"-joined path matches ignore."""
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: strip_volatile(value, path + (key,), ignore)
+        for key, value in data.items()
+        if not any(pattern.search("/".join(map(str, path + (key,)))) for pattern in ignore)
+    }
+
+
+def strip_volatile_lines(text, ignore=()):
+    """Copy of a raw command output without the lines that match ignore."""
+    return "\n".join(
+        line for line in text.splitlines()
+        if not any(pattern.search(line) for pattern in ignore)
+    )
+
+
+def diff_structures(before, after, path=(), ignore=()):
+    """
+    Yield the differences between two JSON-like structures.
+
+    Dicts are compared key by key, everything else (including lists) as a
+    whole value.
+
+    :param ignore: Compiled regexes matched against the "/"-joined path of
+                   each dict key; matching keys are skipped.
+    :return: Iterator of (op, path, before, after) with op one of
+             "added", "removed" or "changed".
+    """
+    if isinstance(before, dict) and isinstance(after, dict):
+        for key in sorted(set(before) | set(after), key=str):
+            key_path = path + (key,)
+            if any(pattern.search("/".join(map(str, key_path))) for pattern in ignore):
+                continue
+            if key not in after:
+                yield "removed", key_path, before[key], None
+            elif key not in before:
+                yield "added", key_path, None, after[key]
+            elif before[key] != after[key]:
+                yield from diff_structures(before[key], after[key], key_path, ignore)
+    elif before != after:
+        yield "changed", path, before, after
+
+
+class SnapshotStore:
+    """
+    Snapshots of device state keyed by device and run.
+
+    :param root: Directory of the store, created on first write.
+    """
+
+    def __init__(self, root=DEFAULT_SNAPSHOT_DIR):
+        self.root = root
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    def _device_dir(self, device):
+        return os.path.join(self.root, "snapshots", quote(device, safe="-_."))
+
+    def _manifest_path(self, device, run):
+        return os.path.join(self._device_dir(device), f"{quote(run, safe='-_.')}.json")
+
+    def put_blob(self, data):
+        """Store a JSON-serializable value once and return its hash."""
+        payload = _canonical(data)
+        digest = hashlib.sha256(payload).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            _write_atomic(path, zlib.compress(payload, COMPRESSION_LEVEL))
+        return digest
+
+    def get_blob(self, digest):
+        with open(self._object_path(digest), "rb") as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def save(self, device, run, features, errors=None, ignore=DEFAULT_IGNORE,
+             ignore_lines=DEFAULT_IGNORE_LINES):
+        """
+        Store a snapshot of a device.
+
+        Volatile keys such as counters, and volatile lines of raw outputs such
+        as the last configuration change, are left out, so that features which
+        did not change between runs hash to the same blob.
+
+        :param device: Device name.
+        :param run: Run id, e.g. a timestamp shared by all devices of a job.
+        :param features: Dict of feature name to JSON-serializable state.
+        :param errors: Optional dict of feature name to why it was not collected.
+        :param ignore: Regexes for paths ("<feature>/<key>/...") not to store.
+        :param ignore_lines: Regexes for lines of raw (string) outputs not to store.
+        :return: The manifest written.
+        """
+        patterns = [re.compile(pattern) for pattern in ignore]
+        line_patterns = [re.compile(pattern) for pattern in ignore_lines]
+        manifest = {
+            "device": device,
+            "run": run,
+            "taken_at": time.time(),
+            "features": {
+                name: self.put_blob(
+                    strip_volatile_lines(data, line_patterns) if isinstance(data, str)
+                    else strip_volatile(data, (name,), patterns)
+                )
+                for name, data in sorted(features.items())
+            },
+            "errors": dict(errors or {}),
+        }
+        _write_atomic(self._manifest_path(device, run), json.dumps(manifest, indent=2).encode())
+        return manifest
+
+    def manifest(self, device, run):
+        """
+        Manifest of a snapshot, without loading any feature data.
+
+        :raises KeyError: If there is no such snapshot.
+        """
+        try:
+            with open(self._manifest_path(device, run)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise KeyError(f"No snapshot of {device} for run {run}") from None
+
+    def load(self, device, run, features=None):
+        """Feature data of a snapshot, optionally only the given features."""
+        hashes = self.manifest(device, run)["features"]
+        return {
+            name: self.get_blob(digest)
+            for name, digest in hashes.items()
+            if features is None or name in features
+        }
+
+    def devices(self):
+        try:
+            return sorted(unquote(name) for name in os.listdir(os.path.join(self.root, "snapshots")))
+        except FileNotFoundError:
+            return []
+
+    def runs(self, device):
+        """Run ids of a device, oldest first."""
+        try:
+            names = os.listdir(self._device_dir(device))
+        except FileNotFoundError:
+            return []
+        manifests = [self.manifest(device, unquote(name[:-5])) for name in names if name.endswith(".json")]
+        return [m["run"] for m in sorted(manifests, key=lambda m: (m["taken_at"], m["run"]))]
+
+    def diff(self, device, run_a, run_b, ignore=DEFAULT_IGNORE):
+        """
+        Structural diff between two snapshots of a device.
+
+        Features with the same hash in both snapshots are skipped without
+        reading their data.
+
+        :param ignore: Regexes for paths ("<feature>/<key>/...") to skip.
+        :return: List of dicts with feature, op, path, before and after.
+        """
+        before = self.manifest(device, run_a)["features"]
+        after = self.manifest(device, run_b)["features"]
+        patterns = [re.compile(pattern) for pattern in ignore]
+
+        changes = []
+        for feature in sorted(set(before) | set(after)):
+            if before.get(feature) == after.get(feature) or any(p.search(feature) for p in patterns):
+                continue
+            if feature not in after:
+                changes.append({"feature": feature, "op": "removed", "path": [], "before": None, "after": None})
+            elif feature not in before:
+                changes.append({"feature": feature, "op": "added", "path": [], "before": None, "after": None})
+            else:
+                for op, path, old, new in diff_structures(
+                    self.get_blob(before[feature]), self.get_blob(after[feature]), (feature,), patterns
+                ):
+                    changes.append({"feature": feature, "op": op, "path": list(path[1:]), "before": old, "after": new})
+        return changes
+
+    def drift(self, run=None, baseline=None, ignore=DEFAULT_IGNORE):
+        """
+        Diff every device between two runs.
+
+        :param run: Run to check, by default each device's latest run.
+        :param baseline: Run to compare with, by default the run before `run`.
+        :return: Dict of device name to its list of changes, for devices
+                 that changed or lack one of the two snapshots.
+        """
+        result = {}
+        for device in self.devices():
+            runs = self.runs(device)
+            current = run or (runs[-1] if runs else None)
+            if baseline:
+                previous = baseline
+            else:
+                older = runs[:runs.index(current)] if current in runs else []
+                previous = older[-1] if older else None
+            if current not in runs or previous not in runs:
+                result[device] = [{"feature": None, "op": "missing", "path": [],
+                                   "before": previous, "after": current}]
+                continue
+            changes = self.diff(device, previous, current, ignore)
+            if changes:
+                result[device] = changes
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and compare device state snapshots.")
+    parser.add_argument("--root", default=os.getenv("PYATS_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR,
+                        help=f"Snapshot store directory (default: $PYATS_SNAPSHOT_DIR or {DEFAULT_SNAPSHOT_DIR})")
+    parser.add_argument("--ignore", action="append", default=None,
+                        help="Regex of paths to ignore in diffs, repeatable (replaces the defaults)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", help="List devices and their runs")
+    diff = commands.add_parser("diff", help="Diff two snapshots of a device")
+    diff.add_argument("device")
+    diff.add_argument("run_a")
+    diff.add_argument("run_b")
+    drift = commands.add_parser("drift", help="Diff all devices between two runs")
+    drift.add_argument("--run", help="Run to check (default: latest per device)")
+    drift.add_argument("--baseline", help="Run to compare with (default: the previous run)")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.root)
+    ignore = DEFAULT_IGNORE if args.ignore is None else args.ignore
+
+    if args.command == "list":
+        result = {device: store.runs(device) for device in store.devices()}
+    elif args.command == "diff":
+        try:
+            result = store.diff(args.device, args.run_a, args.run_b, ignore)
+        except KeyError as e:
+            sys.exit(str(e.args[0]))
+    else:
+        result = store.drift(args.run, args.baseline, ignore)
+
+    print(json.dumps(result, indent=2, default=str))
+    # Non-zero exit status on drift for use in scheduled checks
+    sys.exit(1 if args.command in ("diff", "drift") and result else 0)
+
+
+if __name__ == "__main__":
+    main()
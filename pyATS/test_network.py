@@ -16,107 +16,313 @@ or implied.
 """
 
 from pyats import aetest
+from pyats.results import Passed
 from genie.testbed import load
 import logging
 import pynetbox
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from subprocess import call
+from check_engine import (
+    DEFAULT_CATALOGUE,
+    CatalogueError,
+    CommandCache,
+    CommandError,
+    evaluate_check,
+    load_catalogue,
+    required_commands,
+)
+from snapshot_store import DEFAULT_SNAPSHOT_FEATURES, SnapshotStore
 
 logging.basicConfig(level=logging.INFO)
 
 import subprocess
 
+# Upper bound for concurrent SSH sessions opened or closed at once
+DEFAULT_MAX_WORKERS = 20
+
+# Devices per NetBox list/bulk PATCH request
+NETBOX_CHUNK_SIZE = 100
+
+
+def run_on_devices(devices, action, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Run action(device) for every device using a bounded thread pool.
+
+    Threads are used instead of pcall's forked processes so that the
+    connections stay attached to the testbed objects in this process.
+
+    :param devices: Dict of device name to device object.
+    :param action: Callable taking a device.
+    :param max_workers: Maximum number of devices handled at once.
+    :return: Tuple of (results, failures): dicts of device name to the value
+             returned by action, and to the error message for devices that failed.
+    """
+    results, failures = {}, {}
+    if not devices:
+        return results, failures
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(devices)))) as executor:
+        futures = {name: executor.submit(action, device) for name, device in devices.items()}
+        for device_name, future in futures.items():
+            try:
+                results[device_name] = future.result()
+            except Exception as e:
+                failures[device_name] = str(e)
+    return results, failures
+
+
+def run_checks(steps, testbed, checks, command_cache, variables):
+    """
+    Evaluate checks against the cached command outputs, one step per device
+    with a sub-step per check.
+
+    :return: Names of the devices that passed all checks.
+    """
+    passed_devices = []
+    for device_name in testbed.devices:
+        with steps.start(f"Running {len(checks)} checks on {device_name}") as device_step:
+            for check in checks:
+                with device_step.start(f"{check['name']} on {device_name}") as step:
+                    try:
+                        failures = evaluate_check(check, command_cache, device_name, variables)
+                    except CommandError as e:
+                        step.failed(f"{check['name']} could not run on {device_name}: {e}")
+                    if failures:
+                        step.failed(f"{check['name']} failed on {device_name}: {'; '.join(failures)}")
+                    step.passed(f"{check['description'] or check['name']} on {device_name}")
+
+        if device_step.result == Passed:
+            passed_devices.append(device_name)
+    return passed_devices
+
+
 class CommonSetup(aetest.CommonSetup):
     @aetest.subsection
-    def connect(self, testbed):
+    def connect(self, testbed, max_workers=DEFAULT_MAX_WORKERS, continue_on_connect_failure=False):
         """
-        Connect to all devices in the testbed
+        Connect to all devices in the testbed in parallel.
+
+        With continue_on_connect_failure, devices that could not be reached are
+        removed from the testbed and the job continues with the others.
         """
-        logging.info("Connecting to devices...")
-        for device_name, device in testbed.devices.items():
-            try:
-                device.connect()
+        logging.info(f"Connecting to {len(testbed.devices)} devices...")
+        _, failures = run_on_devices(
+            dict(testbed.devices), lambda device: device.connect(log_stdout=False), max_workers
+        )
+
+        for device_name in testbed.devices:
+            if device_name not in failures:
                 logging.info(f"Connected to {device_name}")
-            except Exception as e:
-                logging.error(f"Failed to connect to {device_name}: {str(e)}")
-                self.failed(f"Failed to connect to {device_name}: {str(e)}")
+        for device_name, error in failures.items():
+            logging.error(f"Failed to connect to {device_name}: {error}")
+
+        if not failures:
+            return
+
+        summary = "; ".join(f"{name}: {error}" for name, error in failures.items())
+        if not continue_on_connect_failure or len(failures) == len(testbed.devices):
+            self.failed(f"Failed to connect to {len(failures)} device(s): {summary}")
+
+        for device_name in failures:
+            testbed.remove_device(testbed.devices[device_name])
+        self.passx(f"Continuing without {len(failures)} unreachable device(s): {summary}")
+
+    @aetest.subsection
+    def collect_command_outputs(self, testbed, check_catalogue=None, expected_ntp_peer=None,
+                                max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Load the check catalogue and run every command it needs once per
+        device, all devices concurrently.
+
+        The outputs are cached for the whole job and shared with the
+        testcases as the command_cache parameter. Catalogue variables are
+        overridden by the testbed's custom section, and ntp_peer by the
+        expected_ntp_peer job parameter.
+        """
+        try:
+            checks, variables = load_catalogue(check_catalogue or DEFAULT_CATALOGUE)
+        except CatalogueError as e:
+            self.failed(str(e))
+
+        variables.update({key: value for key, value in testbed.custom.items() if key in variables})
+        if expected_ntp_peer:
+            variables["ntp_peer"] = expected_ntp_peer
 
-class TestcaseNTP(aetest.Testcase):
-    
-    must_pass=True
-    
+        commands = required_commands(checks)
+        command_cache = CommandCache()
+        logging.info(
+            f"Collecting {len(commands)} commands for {len(checks)} checks from {len(testbed.devices)} devices..."
+        )
+        results, failures = run_on_devices(
+            dict(testbed.devices), lambda device: command_cache.collect(device, commands), max_workers
+        )
+        for device_name, failed in results.items():
+            if failed:
+                logging.warning(f"{failed} of {len(commands)} commands failed on {device_name}")
+        for device_name, error in failures.items():
+            logging.error(f"Failed to collect command outputs from {device_name}: {error}")
+
+        self.parent.parameters.update(
+            checks=checks, check_variables=variables, command_cache=command_cache
+        )
+
+class TestcaseRequiredChecks(aetest.Testcase):
     @aetest.test
-    
-    def verify_ntp_peer(self, testbed, steps):
+    def verify_required_checks(self, testbed, steps, checks, command_cache, check_variables):
         """
-        Verify that the expected NTP peer is configured 
-        and synchronized
+        Run the checks marked as required in the catalogue, such as the NTP
+        peer check. Only devices passing all of them are activated in NetBox;
+        a failing device does not keep the others from being activated.
         """
-        expected_ntp_peer = "198.18.133.141"
-        for device_name, device in testbed.devices.items():
-            with steps.start(f"Checking NTP peer configuration on {device_name}") as step:
-                try:
-                    ntp_output = device.parse("show ntp associations")
-                    associations = ntp_output.get("peer", {})
-                    system_status = ntp_output.get("clock_state", {}).get("system_status", {})
-
-                    # Check if expected NTP peer is configured
-                    if expected_ntp_peer in associations:
-                        peer_info = associations[expected_ntp_peer]
-
-                        # Check if the peer is the system's synchronized peer
-                        if system_status.get("associations_address") == expected_ntp_peer and system_status.get("clock_state") == "synchronized":
-                            step.passed(f"Expected NTP peer {expected_ntp_peer} is configured and synchronized on {device_name}")
-                        else:
-                            step.failed(f"NTP peer {expected_ntp_peer} is configured but not synchronized on {device_name} (clock_state: {system_status})")
-                    else:
-                        step.failed(f"Expected NTP peer {expected_ntp_peer} not found on {device_name}")
+        required = [check for check in checks if check["required"]]
+
+        # Shared with NetboxUpdate so only verified devices are activated
+        passed_devices = []
+        self.parent.parameters["verified_devices"] = passed_devices
+
+        if not required:
+            logging.warning("The check catalogue has no required checks, all devices count as verified")
+            passed_devices.extend(testbed.devices)
+            self.passed("No required checks in the catalogue")
+
+        passed_devices.extend(run_checks(steps, testbed, required, command_cache, check_variables))
+
+
+class TestcaseChecks(aetest.Testcase):
+    @aetest.test
+    def verify_checks(self, testbed, steps, checks, command_cache, check_variables):
+        """
+        Run the remaining checks of the catalogue. Failures are reported but
+        do not keep devices from being activated.
+        """
+        optional = [check for check in checks if not check["required"]]
+        if not optional:
+            self.skipped("No optional checks in the catalogue")
+        run_checks(steps, testbed, optional, command_cache, check_variables)
 
-                except Exception as e:
-                    step.failed(f"Failed to parse NTP configuration on {device_name}: {str(e)}")
-                    
 class NetboxUpdate(aetest.Testcase):
     @aetest.test
-    def update_device_status(self, testbed, netbox_url, netbox_token):
+    def update_device_status(self, testbed, netbox_url, netbox_token, verified_devices=None):
         """
         Update device status in Netbox from "planned" to "active"
-        if the test was successful.
+        for the devices that passed TestcaseRequiredChecks. Runs even if
+        that testcase failed for some devices, and is skipped only when no
+        device passed.
+
+        Devices are looked up with one filtered list call and updated through
+        the bulk PATCH endpoint, both in chunks of NETBOX_CHUNK_SIZE.
         """
         if not netbox_token or not netbox_url:
             self.failed("NetBox API credentials are not set in the environment variables.")
 
-        logging.info("Updating device statuses in NetBox...")
+        device_names = [name for name in testbed.devices if name in (verified_devices or [])]
+        skipped = [name for name in testbed.devices if name not in device_names]
+        if skipped:
+            logging.warning(f"Not activating devices that did not pass the required checks: {', '.join(skipped)}")
+        if not device_names:
+            self.skipped("No devices passed the required checks.")
+
+        logging.info(f"Updating status for {len(device_names)} devices in NetBox...")
         nb = pynetbox.api(url=netbox_url, token=netbox_token)
         nb.http_session.verify = False  # Disable SSL verification for self-signed certs
+        # One keep-alive connection pool for all list and PATCH calls
+        nb.http_session.mount(netbox_url, HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+        chunks = [
+            device_names[i:i + NETBOX_CHUNK_SIZE]
+            for i in range(0, len(device_names), NETBOX_CHUNK_SIZE)
+        ]
+
+        try:
+            nb_devices = [device for chunk in chunks for device in nb.dcim.devices.filter(name=chunk)]
+        except Exception as e:
+            logging.error(f"Error retrieving devices from NetBox: {str(e)}")
+            self.failed(f"Error retrieving devices from NetBox: {str(e)}")
 
-        for device_name, _ in testbed.devices.items():
-            logging.info(f"Updating status for device: {device_name}")
+        found = {device.name for device in nb_devices}
+        for device_name in device_names:
+            if device_name not in found:
+                logging.warning(f"Device '{device_name}' not found in NetBox.")
+
+        updates = [{"id": device.id, "status": "active"} for device in nb_devices]
+        for i in range(0, len(updates), NETBOX_CHUNK_SIZE):
+            chunk = updates[i:i + NETBOX_CHUNK_SIZE]
             try:
-                device = nb.dcim.devices.get(name=device_name)
-                if device:
-                    try:
-                        device.update({"status": "active"})
-                        logging.info(f"Device '{device_name}' status updated to 'active'.")
-                    except pynetbox.core.query.RequestError as e:
-                        logging.error(f"Failed to update device '{device_name}' status: {e}")
-                        self.failed(f"Failed to update device '{device_name}' status: {e}")
-                else:
-                    logging.warning(f"Device '{device_name}' not found in NetBox.")
-            except Exception as e:
-                logging.error(f"Error retrieving device '{device_name}' from NetBox: {str(e)}")
-                self.failed(f"Error retrieving device '{device_name}' from NetBox: {str(e)}")
+                nb.dcim.devices.update(chunk)
+            except pynetbox.core.query.RequestError as e:
+                logging.error(f"Failed to update device status: {e}")
+                self.failed(f"Failed to update status of {len(chunk)} device(s): {e}")
+
+        for device in nb_devices:
+            logging.info(f"Device '{device.name}' status updated to 'active'.")
 
 class CommonCleanup(aetest.CommonCleanup):
     @aetest.subsection
-    def disconnect(self, testbed):
+    def snapshot_state(self, testbed, snapshot_dir=None, snapshot_run=None,
+                       snapshot_features=DEFAULT_SNAPSHOT_FEATURES, command_cache=None,
+                       max_workers=DEFAULT_MAX_WORKERS):
+        """
+        Store a snapshot of each device's state in the snapshot store.
+
+        A snapshot holds the learned Genie features and the command outputs
+        already cached for the checks. Identical features are stored only
+        once, so repeated runs of unchanged devices take little space. Skipped
+        unless snapshot_dir is set.
+        """
+        if not snapshot_dir:
+            self.skipped("No snapshot directory set")
+
+        store = SnapshotStore(snapshot_dir)
+        run_id = snapshot_run or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+
+        def snapshot(device):
+            features, errors = {}, {}
+            for feature in snapshot_features:
+                try:
+                    learned = device.learn(feature)
+                    features[feature] = learned if isinstance(learned, dict) else getattr(learned, "info", {})
+                except Exception as e:
+                    errors[feature] = str(e)
+            if command_cache is not None:
+                features.update(command_cache.outputs(device.name))
+            return store.save(device.name, run_id, features, errors)
+
+        connected = {
+            name: device for name, device in testbed.devices.items() if device.is_connected()
+        }
+        logging.info(f"Taking snapshot {run_id} of {len(connected)} devices...")
+        results, failures = run_on_devices(connected, snapshot, max_workers)
+
+        for device_name, manifest in results.items():
+            for feature, error in manifest["errors"].items():
+                logging.warning(f"Could not learn {feature} on {device_name}: {error}")
+        for device_name, error in failures.items():
+            logging.error(f"Failed to snapshot {device_name}: {error}")
+
+        if failures:
+            summary = "; ".join(f"{name}: {error}" for name, error in failures.items())
+            self.failed(f"Failed to snapshot {len(failures)} device(s): {summary}")
+
+    @aetest.subsection
+    def disconnect(self, testbed, max_workers=DEFAULT_MAX_WORKERS):
         logging.info("Disconnecting from devices...")
-        for device_name, device in testbed.devices.items():
-            try:
-                device.disconnect()
+        connected = {
+            name: device for name, device in testbed.devices.items() if device.is_connected()
+        }
+        _, failures = run_on_devices(connected, lambda device: device.disconnect(), max_workers)
+
+        for device_name in connected:
+            if device_name not in failures:
                 logging.info(f"Disconnected from {device_name}")
-            except Exception as e:
-                logging.error(f"Failed to disconnect from {device_name}: {str(e)}")
-                self.failed(f"Failed to disconnect from {device_name}: {str(e)}")
+        for device_name, error in failures.items():
+            logging.error(f"Failed to disconnect from {device_name}: {error}")
+
+        if failures:
+            summary = "; ".join(f"{name}: {error}" for name, error in failures.items())
+            self.failed(f"Failed to disconnect from {len(failures)} device(s): {summary}")
 
 if __name__ == "__main__":
     testbed = load("testbed.yml")
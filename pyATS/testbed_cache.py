@@ -0,0 +1,173 @@
+"""
+Copyright (c) 2026 Cisco and/or its affiliates.
+
+This software is licensed to you under the terms of the Cisco Sample
+Code License, Version 1.1 (the "License"). You may obtain a copy of the
+License at
+
+               https://developer.cisco.com/docs/licenses
+
+All use of the material herein must be in accordance with the terms of
+the License. All rights not expressly granted by the License are
+reserved. Unless required by applicable law or agreed to separately in
+writing, software distributed under the License is distributed on an "AS
+IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express
+or implied.
+"""
+
+import hashlib
+import logging
+import os
+import time
+
+import pynetbox
+import yaml
+from pyats.contrib.creators.netbox import Netbox
+
+DEFAULT_CACHE_DIR = ".testbed_cache"
+DEFAULT_MAX_AGE = 24 * 3600
+
+# Device names per regenerate request, keeps the filter URL short
+NAME_CHUNK_SIZE = 50
+
+# Connection settings that are never written to the cache
+SECRET_KEYS = ("credentials", "password", "enable_password", "secret")
+
+
+def _cache_path(cache_dir, netbox_url, url_filter):
+    key = hashlib.sha256(f"{netbox_url}|{url_filter}".encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"testbed_{key}.yaml")
+
+
+def _load_cache(path, max_age):
+    try:
+        if time.time() - os.path.getmtime(path) > max_age:
+            logging.info("Testbed cache is older than the maximum age, regenerating all devices")
+            return None
+        with open(path) as f:
+            return yaml.safe_load(f)
+    except (OSError, yaml.YAMLError):
+        return None
+
+
+def _without_secrets(testbed):
+    """Copy of a testbed without the testbed, device and connection credentials."""
+    stored = dict(testbed)
+    stored["testbed"] = {k: v for k, v in testbed.get("testbed", {}).items() if k != "credentials"}
+    stored["devices"] = {}
+    for name, device in testbed.get("devices", {}).items():
+        device = {k: v for k, v in device.items() if k != "credentials"}
+        if isinstance(device.get("connections"), dict):
+            device["connections"] = {
+                connection: {k: v for k, v in settings.items() if k not in SECRET_KEYS}
+                if isinstance(settings, dict) else settings
+                for connection, settings in device["connections"].items()
+            }
+        stored["devices"][name] = device
+    return stored
+
+
+def _add_credentials(testbed, cli_user, cli_password):
+    """Put the credentials back that _without_secrets() removed, from the job's settings."""
+    credentials = {"default": {"username": cli_user, "password": cli_password}}
+    testbed.setdefault("testbed", {})["credentials"] = credentials
+    # As the NetBox creator does for every device it generates
+    if cli_user or cli_password:
+        for device in testbed.get("devices", {}).values():
+            device.setdefault("credentials", {"default": dict(credentials["default"])})
+
+
+def _save_cache(path, testbed, timestamps, generated_at):
+    # Credentials are put back by _add_credentials() and never written to disk
+    stored = _without_secrets(testbed)
+    os.makedirs(os.path.dirname(path) or ".", mode=0o700, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        yaml.safe_dump(
+            {"generated_at": generated_at, "last_updated": timestamps, "testbed": stored}, f
+        )
+    os.replace(tmp_path, path)
+
+
+def _generate(netbox_url, netbox_token, url_filter, cli_user, cli_password):
+    # The creator returns None instead of an empty testbed when no device matches
+    return Netbox(
+        netbox_url=netbox_url,
+        user_token=netbox_token,
+        def_user=cli_user,
+        def_pass=cli_password,
+        url_filter=url_filter,
+        verify=False
+    )._generate() or {"devices": {}, "topology": {}}
+
+
+def _drop_devices(testbed, names):
+    for name in names:
+        testbed.get("devices", {}).pop(name, None)
+        testbed.get("topology", {}).pop(name, None)
+
+
+def generate_testbed(netbox_url, netbox_token, url_filter, cli_user, cli_password,
+                     cache_dir=DEFAULT_CACHE_DIR, max_age=DEFAULT_MAX_AGE):
+    """
+    Generate a pyATS testbed from NetBox, reusing a cached copy where possible.
+
+    The cache is keyed by NetBox URL and filter and stores the testbed together
+    with each device's last_updated timestamp. One list call finds the devices
+    that currently match the filter; only devices that are new or changed since
+    the cached run are regenerated, removed devices are dropped. The whole
+    testbed is regenerated when the cache is older than max_age, since changes
+    to interfaces or IPs alone do not touch the device's last_updated.
+
+    :param netbox_url: NetBox base URL.
+    :param netbox_token: NetBox API token.
+    :param url_filter: Device filter, e.g. "status=planned".
+    :param cli_user: Default device CLI username.
+    :param cli_password: Default device CLI password.
+    :param cache_dir: Directory for cache files, None to disable caching.
+    :param max_age: Seconds after which the whole testbed is regenerated.
+    :return: Testbed dict for genie.testbed.load().
+    """
+    if not cache_dir:
+        testbed = _generate(netbox_url, netbox_token, url_filter, cli_user, cli_password)
+        _add_credentials(testbed, cli_user, cli_password)
+        return testbed
+
+    nb = pynetbox.api(url=netbox_url, token=netbox_token)
+    nb.http_session.verify = False  # Disable SSL verification for self-signed certs
+    filters = dict(pair.split("=", 1) for pair in url_filter.split("&") if "=" in pair)
+    current = {
+        device.name: str(device.last_updated)
+        for device in nb.dcim.devices.filter(**filters)
+        if device.name
+    }
+
+    path = _cache_path(cache_dir, netbox_url, url_filter)
+    cached = _load_cache(path, max_age)
+
+    if cached is None:
+        testbed = _generate(netbox_url, netbox_token, url_filter, cli_user, cli_password)
+        generated_at = time.time()
+    else:
+        testbed = cached["testbed"]
+        generated_at = cached["generated_at"]
+        previous = cached.get("last_updated", {})
+        changed = sorted(name for name, stamp in current.items() if previous.get(name) != stamp)
+        removed = [name for name in previous if name not in current]
+
+        _drop_devices(testbed, removed + changed)
+        for i in range(0, len(changed), NAME_CHUNK_SIZE):
+            chunk = changed[i:i + NAME_CHUNK_SIZE]
+            chunk_filter = "&".join([url_filter] + [f"name={name}" for name in chunk])
+            partial = _generate(netbox_url, netbox_token, chunk_filter, cli_user, cli_password)
+            testbed.setdefault("devices", {}).update(partial.get("devices", {}))
+            testbed.setdefault("topology", {}).update(partial.get("topology", {}))
+
+        logging.info(
+            f"Testbed cache: {len(current) - len(changed)} unchanged, "
+            f"{len(changed)} regenerated, {len(removed)} removed"
+        )
+
+    _save_cache(path, testbed, current, generated_at)
+    _add_credentials(testbed, cli_user, cli_password)
+    return testbed